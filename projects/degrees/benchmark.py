@@ -0,0 +1,166 @@
+"""
+Benchmark for degrees on synthetic data.
+
+Generates a random bipartite actor/movie dataset in the degrees CSV
+format, where a few prolific actors appear in many movies as in IMDB,
+then for every way of loading and searching it reports load time,
+peak memory and query latency percentiles.
+
+Every configuration runs in a fresh process so loads and memory use
+do not affect one another; cached ones are timed on a warm load.
+
+Usage: python benchmark.py [--people N] [--movies N] [--cast N] [--queries N]
+"""
+
+import argparse
+import csv
+import os
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+from util import SearchStats
+
+# (label, load_data arguments, search bidirectionally)
+CONFIGURATIONS = [
+    ("dict forward", {}, False),
+    ("dict bidirectional", {}, True),
+    ("dict snapshot", {"cache": True}, True),
+    ("compact forward", {"compact": True}, False),
+    ("compact bidirectional", {"compact": True}, True),
+    ("compact snapshot", {"compact": True, "cache": True}, True),
+    ("compact landmarks", {"compact": True, "cache": True, "landmarks": 8}, True),
+]
+
+
+def generate(directory, people, movies, cast, seed=0):
+    """
+    Writes people.csv, movies.csv and stars.csv to `directory`, with
+    actors cast with Zipf-like popularity. Returns the ids of everyone
+    who appears in at least one movie.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+
+    with open(os.path.join(directory, "people.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for i in range(people):
+            writer.writerow([i, f"Actor {i}", rng.randint(1900, 2010)])
+
+    with open(os.path.join(directory, "movies.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for i in range(movies):
+            writer.writerow([i, f"Movie {i}", rng.randint(1920, 2020)])
+
+    # Actor i is cast with weight 1 / (i + 1), so early ids are hubs
+    weights = []
+    total = 0.0
+    for i in range(people):
+        total += 1 / (i + 1)
+        weights.append(total)
+    order = list(range(people))
+    rng.shuffle(order)
+
+    cast_people = set()
+    with open(os.path.join(directory, "stars.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(movies):
+            size = max(1, round(rng.expovariate(1 / cast)))
+            chosen = set(rng.choices(order, cum_weights=weights, k=size))
+            cast_people.update(chosen)
+            for person in chosen:
+                writer.writerow([person, movie])
+    return sorted(cast_people)
+
+
+def run(directory, options, bidirectional, pairs):
+    """
+    Loads `directory` with `options` and answers `pairs`. Runs in a
+    fresh worker process.
+    """
+    started = time.perf_counter()
+    degrees.load_data(directory, **options)
+    load_seconds = time.perf_counter() - started
+
+    latencies = []
+    totals = SearchStats()
+    found = 0
+    for source, target in pairs:
+        stats = SearchStats()
+        if degrees.shortest_path(source, target, bidirectional, stats) is not None:
+            found += 1
+        latencies.append(stats.seconds)
+        totals.expanded += stats.expanded
+        totals.frontier(stats.frontier_peak)
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak *= 1024
+    return {
+        "load": load_seconds,
+        "memory": peak,
+        "latencies": latencies,
+        "expanded": totals.expanded / max(len(pairs), 1),
+        "frontier_peak": totals.frontier_peak,
+        "found": found
+    }
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark degrees on synthetic data.")
+    parser.add_argument("--people", type=int, default=100000)
+    parser.add_argument("--movies", type=int, default=50000)
+    parser.add_argument("--cast", type=float, default=6, help="mean cast size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--directory", help="keep the generated data here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        directory = args.directory or scratch
+        print(f"Generating {args.people} people, {args.movies} movies...")
+        started = time.perf_counter()
+        cast_people = generate(directory, args.people, args.movies, args.cast, args.seed)
+        print(f"Generated in {time.perf_counter() - started:.1f}s\n")
+
+        # Only query people who starred in something
+        rng = random.Random(args.seed + 1)
+        pairs = [
+            (str(rng.choice(cast_people)), str(rng.choice(cast_people)))
+            for _ in range(args.queries)
+        ]
+
+        print(f"{'configuration':<24}{'load s':>8}{'peak MB':>9}"
+              f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'expanded':>10}{'frontier':>10}{'found':>7}")
+        for label, options, bidirectional in CONFIGURATIONS:
+            # Cached configurations are timed on their second, warm load
+            if options.get("cache"):
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    pool.submit(run, directory, options, bidirectional, []).result()
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                result = pool.submit(run, directory, options, bidirectional, pairs).result()
+            latencies = [seconds * 1000 for seconds in result["latencies"]]
+            print(f"{label:<24}{result['load']:>8.2f}{result['memory'] / 2 ** 20:>9.0f}"
+                  f"{statistics.median(latencies):>9.2f}{percentile(latencies, 0.9):>9.2f}"
+                  f"{percentile(latencies, 0.99):>9.2f}{result['expanded']:>10.0f}"
+                  f"{result['frontier_peak']:>10}{result['found']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+"""
+Compact, integer-indexed representation of the degrees dataset.
+
+IMDB ids are interned to dense integers and the person-movie bipartite
+graph is stored in CSR form: the movies of person `p` are
+`person_movies[person_offsets[p]:person_offsets[p + 1]]`, and the stars
+of movie `m` are `movie_people[movie_offsets[m]:movie_offsets[m + 1]]`.
+"""
+
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
+
+import parallel
+from util import bidirectional_search
+
+# Typecode for every index array (signed 32-bit is plenty for IMDB)
+INDEX = "i"
+
+
+class CompactGraph():
+    def __init__(self):
+        # Person index -> IMDB id, name and birth year, and the reverse lookup
+        self.person_ids = []
+        self.person_names = []
+        self.person_births = []
+        self.person_index = {}
+
+        # Movie index -> IMDB id, title and year, and the reverse lookup
+        self.movie_ids = []
+        self.movie_titles = []
+        self.movie_years = []
+        self.movie_index = {}
+
+        # Lowercased name -> list of person indexes
+        self.name_index = {}
+
+        # Optional landmarks.LandmarkIndex used to speed up searches
+        self.landmarks = None
+
+        # CSR adjacency in both directions
+        self.person_offsets = array(INDEX, [0])
+        self.person_movies = array(INDEX)
+        self.movie_offsets = array(INDEX, [0])
+        self.movie_people = array(INDEX)
+
+    def add_person(self, person_id, name, birth):
+        index = len(self.person_ids)
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        self.person_index[person_id] = index
+        self.name_index.setdefault(name.lower(), []).append(index)
+        return index
+
+    def add_movie(self, movie_id, title, year):
+        index = len(self.movie_ids)
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        self.movie_index[movie_id] = index
+        return index
+
+    def build_edges(self, edge_people, edge_movies):
+        """
+        Builds both CSR adjacency tables from parallel arrays of
+        (person index, movie index) edges. Duplicate edges are dropped.
+
+        Both tables are filled by counting sort straight from the index
+        arrays, so no Python object is built per edge.
+        """
+        people = len(self.person_ids)
+
+        # Group each person's movies together, then sort and dedupe each row
+        offsets = _offsets(edge_people, people)
+        slots = offsets[:-1]
+        grouped = array(INDEX, [0]) * len(edge_movies)
+        for person, movie in zip(edge_people, edge_movies):
+            grouped[slots[person]] = movie
+            slots[person] += 1
+
+        self.person_offsets = array(INDEX, [0]) * (people + 1)
+        self.person_movies = array(INDEX)
+        for person in range(people):
+            row = grouped[offsets[person]:offsets[person + 1]]
+            self.person_movies.extend(sorted(set(row)))
+            self.person_offsets[person + 1] = len(self.person_movies)
+        del grouped
+
+        # Visiting people in order leaves every movie's stars sorted
+        self.movie_offsets = _offsets(self.person_movies, len(self.movie_ids))
+        slots = self.movie_offsets[:-1]
+        self.movie_people = array(INDEX, [0]) * len(self.person_movies)
+        for person in range(people):
+            for movie in self.movies_of(person):
+                self.movie_people[slots[movie]] = person
+                slots[movie] += 1
+
+    def movies_of(self, person):
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]
+        ]
+
+    def stars_of(self, movie):
+        return self.movie_people[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+        ]
+
+    def shared_movie(self, person, other):
+        """
+        Returns the index of a movie that two co-stars both starred in.
+        """
+        offsets, movies = self.person_offsets, self.person_movies
+        if offsets[person + 1] - offsets[person] > offsets[other + 1] - offsets[other]:
+            person, other = other, person
+
+        # Look the shorter filmography up in the longer one, which is sorted;
+        # landmarks are people with very long ones
+        start, end = offsets[other], offsets[other + 1]
+        for movie in self.movies_of(person):
+            i = bisect_left(movies, movie, start, end)
+            if i < end and movies[i] == movie:
+                return movie
+        raise ValueError("people have no movie in common")
+
+    def neighbors(self, person):
+        """
+        Yields (movie index, person index) pairs for everyone who
+        starred with person index `person`.
+        """
+        movie_offsets, movie_people = self.movie_offsets, self.movie_people
+        for movie in self.movies_of(person):
+            for other in movie_people[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                yield movie, other
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        return {
+            (self.movie_ids[movie], self.person_ids[other])
+            for movie, other in self.neighbors(self.person_index[person_id])
+        }
+
+    def shortest_path(self, source, target, bidirectional=False, stats=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target, or None.
+        `stats` is an optional util.SearchStats to fill in.
+        With a landmark index the search is always bidirectional.
+        """
+        source = self.person_index[source]
+        target = self.person_index[target]
+        if self.landmarks is not None:
+            people = self.landmarks.shortest_path(self, source, target, stats)
+            if people is None:
+                return None
+            return [
+                (self.movie_ids[self.shared_movie(person, other)], self.person_ids[other])
+                for person, other in zip(people, people[1:])
+            ]
+        if bidirectional:
+            path = bidirectional_search(source, target, self.neighbors, stats)
+        else:
+            path = self._search(source, target, stats)
+        if path is None:
+            return None
+        return [
+            (self.movie_ids[movie], self.person_ids[person])
+            for movie, person in path
+        ]
+
+    def _search(self, source, target, stats=None):
+        """
+        Forward breadth-first search over person indexes.
+        """
+        if source == target:
+            return []
+        neighbors = self.neighbors
+        if stats is not None:
+            neighbors = stats.neighbors(neighbors)
+
+        # Person index -> (parent person index, movie index)
+        parents = {source: (None, None)}
+        layer = [source]
+        while layer:
+            next_layer = []
+            for person in layer:
+                for movie, other in neighbors(person):
+                    if other in parents:
+                        continue
+                    parents[other] = (person, movie)
+                    if other == target:
+                        return _walk(parents, target)
+                    next_layer.append(other)
+            layer = next_layer
+            if stats is not None:
+                stats.frontier(len(layer))
+        return None
+
+
+class PeopleView(Mapping):
+    """
+    Read-only view of a CompactGraph shaped like `degrees.people`.
+    """
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person_index[person_id]
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": {graph.movie_ids[movie] for movie in graph.movies_of(person)}
+        }
+
+    def __contains__(self, person_id):
+        return person_id in self.graph.person_index
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+
+class MoviesView(Mapping):
+    """
+    Read-only view of a CompactGraph shaped like `degrees.movies`.
+    """
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie_index[movie_id]
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie],
+            "stars": {graph.person_ids[person] for person in graph.stars_of(movie)}
+        }
+
+    def __contains__(self, movie_id):
+        return movie_id in self.graph.movie_index
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+
+class NamesView(Mapping):
+    """
+    Read-only view of a CompactGraph shaped like `degrees.names`.
+    """
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, name):
+        graph = self.graph
+        return {graph.person_ids[person] for person in graph.name_index[name]}
+
+    def __contains__(self, name):
+        return name in self.graph.name_index
+
+    def __iter__(self):
+        return iter(self.graph.name_index)
+
+    def __len__(self):
+        return len(self.graph.name_index)
+
+
+def load_graph(directory, workers=0, progress=None):
+    """
+    Load data from CSV files into a CompactGraph, parsing them in
+    `workers` processes when there is more than one.
+    """
+    graph = CompactGraph()
+    edge_people = array(INDEX)
+    edge_movies = array(INDEX)
+
+    for filename, rows in parallel.read_tables(directory, workers, progress):
+        # Load people
+        if filename == "people.csv":
+            for person_id, name, birth in rows:
+                graph.add_person(person_id, name, birth)
+
+        # Load movies
+        elif filename == "movies.csv":
+            for movie_id, title, year in rows:
+                graph.add_movie(movie_id, title, year)
+
+        # Load stars, skipping rows that reference unknown ids
+        else:
+            for person_id, movie_id in rows:
+                person = graph.person_index.get(person_id)
+                movie = graph.movie_index.get(movie_id)
+                if person is None or movie is None:
+                    continue
+                edge_people.append(person)
+                edge_movies.append(movie)
+
+    graph.build_edges(edge_people, edge_movies)
+    return graph
+
+
+def _offsets(keys, size):
+    """
+    Returns CSR row offsets for a stream of row keys, in any order.
+    """
+    counts = array(INDEX, [0]) * (size + 1)
+    for key in keys:
+        counts[key + 1] += 1
+    for i in range(size):
+        counts[i + 1] += counts[i]
+    return counts
+
+
+def _walk(parents, person):
+    """
+    Follows (parent, movie) links back from `person` to the root and
+    returns the (movie, person) index pairs from the root onwards.
+    """
+    path = []
+    while parents[person][0] is not None:
+        parent, movie = parents[person]
+        path.append((movie, person))
+        person = parent
+    path.reverse()
+    return path
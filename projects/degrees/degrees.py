@@ -1,7 +1,12 @@
-import csv
+import argparse
 import sys
 
-from util import Node, StackFrontier, QueueFrontier
+import compact as compact_module
+import landmarks as landmarks_module
+import nameindex
+import parallel
+import snapshot
+from util import Node, StackFrontier, QueueFrontier, bidirectional_search
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -12,54 +17,145 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Integer-indexed CompactGraph, set when data is loaded with compact=True
+graph = None
 
-def load_data(directory):
+# nameindex.NameIndex over `names`, set when data is loaded with index_names=True
+name_index = None
+
+
+def load_data(directory, compact=False, cache=False, landmarks=0, index_names=False,
+              workers=0, progress=None):
     """
     Load data from CSV files into memory.
+
+    With `compact`, the data is held in a CompactGraph instead and
+    `names`, `people` and `movies` become read-only views over it.
+
+    With `cache`, a binary snapshot stored in `directory` is used when it
+    is up to date with the CSV files, and written after parsing otherwise.
+
+    With `landmarks`, the compact graph also gets a landmark distance
+    index over that many people, which `shortest_path` then uses.
+
+    With `index_names`, `name_index` is built (or read from the cache)
+    for prefix and approximate name lookups.
+
+    With `workers`, the CSV files are parsed in that many processes, and
+    `progress(done, total)` is told how many bytes have been parsed.
     """
-    # Load people
-    with open(f"{directory}/people.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
-
-    # Load movies
-    with open(f"{directory}/movies.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
-
-    # Load stars
-    with open(f"{directory}/stars.csv", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
+    global name_index
+    if landmarks and not compact:
+        raise ValueError("a landmark index needs compact=True")
+
+    data = snapshot.load_snapshot(directory, compact) if cache else None
+    if data is None:
+        if compact:
+            data = compact_module.load_graph(directory, workers, progress)
+        else:
+            load_csv(directory, workers, progress)
+            data = (names, people, movies)
+
+        if cache:
+            # A read-only data directory just means no snapshot
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
+                snapshot.save_snapshot(directory, data, compact)
+            except OSError:
                 pass
 
+    if compact:
+        use_graph(data)
+        if landmarks:
+            landmarks_module.attach_index(directory, graph, landmarks, cache)
+    elif data[0] is not names:
+        names.update(data[0])
+        people.update(data[1])
+        movies.update(data[2])
+
+    if index_names:
+        name_index = nameindex.load_or_build(directory, names, cache)
+
+
+def load_csv(directory, workers=0, progress=None):
+    """
+    Load data from CSV files into `names`, `people` and `movies`,
+    parsing them in `workers` processes when there is more than one.
+    """
+    for filename, rows in parallel.read_tables(directory, workers, progress):
+        # Load people
+        if filename == "people.csv":
+            for person_id, name, birth in rows:
+                people[person_id] = {
+                    "name": name,
+                    "birth": birth,
+                    "movies": set()
+                }
+                if name.lower() not in names:
+                    names[name.lower()] = {person_id}
+                else:
+                    names[name.lower()].add(person_id)
+
+        # Load movies
+        elif filename == "movies.csv":
+            for movie_id, title, year in rows:
+                movies[movie_id] = {
+                    "title": title,
+                    "year": year,
+                    "stars": set()
+                }
+
+        # Load stars
+        else:
+            for person_id, movie_id in rows:
+                try:
+                    people[person_id]["movies"].add(movie_id)
+                    movies[movie_id]["stars"].add(person_id)
+                except KeyError:
+                    pass
+
+
+def use_graph(loaded):
+    """
+    Makes `loaded` CompactGraph the data every query runs against.
+    """
+    global graph, names, people, movies
+    graph = loaded
+    names = compact_module.NamesView(graph)
+    people = compact_module.PeopleView(graph)
+    movies = compact_module.MoviesView(graph)
+
+
+def print_progress(done, total):
+    """
+    Shows how much of the CSV data has been parsed so far.
+    """
+    print(f"\r  {done * 100 // max(total, 1)}% parsed", end="", file=sys.stderr)
+    if done == total:
+        print(file=sys.stderr)
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(description="Find degrees of separation.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--compact", action="store_true",
+                        help="load into the integer-indexed graph")
+    parser.add_argument("--landmarks", type=int, default=0,
+                        help="build a landmark index over this many people (needs --compact)")
+    parser.add_argument("--name-index", action="store_true",
+                        help="suggest close matches for names that are not found")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="parse the CSV files in this many processes")
+    args = parser.parse_args()
+    if args.landmarks and not args.compact:
+        parser.error("--landmarks needs --compact")
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(
+        args.directory, compact=args.compact, cache=True,
+        landmarks=args.landmarks, index_names=args.name_index,
+        workers=args.workers, progress=print_progress
+    )
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,7 +165,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=True)
 
     if path is None:
         print("Not connected.")
@@ -84,13 +180,43 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If `bidirectional` is True, search from both ends at once
+    and meet in the middle.
+
+    If `stats` (a util.SearchStats) is given, it records the people
+    expanded, the peak frontier size and the time taken.
+
     If no possible path, returns None.
     """
+    if stats is not None:
+        stats.start()
+    try:
+        if graph is not None:
+            return graph.shortest_path(source, target, bidirectional, stats)
+        if bidirectional:
+            return bidirectional_shortest_path(source, target, stats)
+        return forward_shortest_path(source, target, stats)
+    finally:
+        if stats is not None:
+            stats.stop()
+
+
+def forward_shortest_path(source, target, stats=None):
+    """
+    Breadth-first search from `source` to `target`.
+
+    Returns the same list of (movie_id, person_id) pairs as
+    `shortest_path`, or None if there is no connection.
+    """
+    neighbors = neighbors_for_person
+    if stats is not None:
+        neighbors = stats.neighbors(neighbors)
+
     #Initialize frontier to starting source
     start = Node(state=source, parent=None, action=None)
     frontier = QueueFrontier()
@@ -122,12 +248,24 @@ def shortest_path(source, target):
         explored.add(node.state)
 
         #Add neighbors to frontier
-        for action, state in neighbors_for_person(node.state):
+        for action, state in neighbors(node.state):
             if not frontier.contains_state(state) and state not in explored:
                 child  = Node(state=state, parent=node,action=action)
                 frontier.add(child)
+        if stats is not None:
+            stats.frontier(len(frontier.frontier))
         
 
+def bidirectional_shortest_path(source, target, stats=None):
+    """
+    Breadth-first search grown from both `source` and `target`.
+
+    Returns the same list of (movie_id, person_id) pairs as
+    `shortest_path`, or None if there is no connection.
+    """
+    return bidirectional_search(source, target, neighbors_for_person, stats)
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
@@ -135,6 +273,12 @@ def person_id_for_name(name):
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        if name_index is not None:
+            suggestions = name_index.search(name, limit=5)
+            if suggestions:
+                print(f"No exact match for '{name}'. Did you mean:")
+                for suggestion in suggestions:
+                    print(f"  {people[next(iter(names[suggestion]))]['name']}")
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -159,6 +303,8 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
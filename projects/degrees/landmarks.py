@@ -0,0 +1,266 @@
+"""
+Landmark (ALT) distance index for the compact degrees graph.
+
+A handful of high-degree people are chosen as landmarks and a
+breadth-first search tree is grown from each one, recording every
+person's distance to the landmark and their parent in the tree.
+By the triangle inequality, for any landmark L
+
+    |d(L, s) - d(L, t)| <= d(s, t) <= d(L, s) + d(L, t)
+
+so the index gives lower bounds to prune a search, exact answers (and
+paths) whenever an endpoint is a landmark or the bounds meet, and proves
+two people unconnected when only one of them is reachable from a landmark.
+"""
+
+import hashlib
+import os
+from array import array
+
+import snapshot
+from compact import INDEX
+from util import bidirectional_search
+
+# Distance recorded for people a landmark cannot reach
+UNREACHED = 0xFFFF
+
+
+class LandmarkIndex():
+    def __init__(self, landmarks, distances, parents):
+        # Person indexes of the landmarks
+        self.landmarks = landmarks
+        self.position = {person: i for i, person in enumerate(landmarks)}
+
+        # One array per landmark, indexed by person: hop distance to the
+        # landmark and parent in its search tree (-1 at the root)
+        self.distances = distances
+        self.parents = parents
+
+    def tree_path(self, i, person):
+        """
+        Returns the person indexes from `person` up to landmark `i`.
+        """
+        parents = self.parents[i]
+        path = [person]
+        while parents[person] != -1:
+            person = parents[person]
+            path.append(person)
+        return path
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper, landmark) bounds on the distance between
+        two people, where `landmark` achieves the upper bound, or None
+        if some landmark proves they are not connected.
+        """
+        lower, upper, via = 0, None, None
+        for i, distances in enumerate(self.distances):
+            to_source, to_target = distances[source], distances[target]
+            if to_source == UNREACHED or to_target == UNREACHED:
+                if to_source != to_target:
+                    return None
+                continue
+            lower = max(lower, abs(to_source - to_target))
+            if upper is None or to_source + to_target < upper:
+                upper, via = to_source + to_target, i
+        return lower, upper, via
+
+    def heuristic(self, target):
+        """
+        Returns a function giving a lower bound on the distance from a
+        person to `target`, or None if they cannot be connected.
+        """
+        columns = [
+            (distances, distances[target]) for distances in self.distances
+        ]
+
+        def estimate(person):
+            best = 0
+            for distances, to_target in columns:
+                to_person = distances[person]
+                if to_person == UNREACHED or to_target == UNREACHED:
+                    if to_person != to_target:
+                        return None
+                    continue
+                gap = to_person - to_target
+                if gap < 0:
+                    gap = -gap
+                if gap > best:
+                    best = gap
+            return best
+
+        return estimate
+
+    def shortest_path(self, graph, source, target, stats=None):
+        """
+        Returns the person indexes on a shortest path from `source` to
+        `target` in `graph`, or None if they are not connected. Falls
+        back to a bidirectional search, pruned by the distance bounds,
+        when the index alone cannot answer.
+        """
+        if source == target:
+            return [source]
+
+        # An endpoint that is a landmark has its whole search tree stored
+        for person, other, flip in ((source, target, False), (target, source, True)):
+            i = self.position.get(person)
+            if i is not None:
+                if self.distances[i][other] == UNREACHED:
+                    return None
+                path = self.tree_path(i, other)
+                return path if flip else path[::-1]
+
+        bounds = self.bounds(source, target)
+        if bounds is None:
+            return None
+        lower, upper, via = bounds
+        if upper is None:
+            # No landmark reaches either person, so there is nothing to prune with
+            path = bidirectional_search(source, target, graph.neighbors, stats)
+            if path is None:
+                return None
+            return [source] + [person for _, person in path]
+
+        # Going through the landmark is already as short as possible
+        through = self.tree_path(via, source) + self.tree_path(via, target)[-2::-1]
+        if upper == lower:
+            return through
+
+        # Only a path shorter than the one through the landmark is worth
+        # finding, so no one whose lower bound rules that out is expanded
+        to_target = self.heuristic(target)
+        to_source = self.heuristic(source)
+
+        def prune(person, depth, forward):
+            remaining = (to_target if forward else to_source)(person)
+            return remaining is None or depth + remaining >= upper
+
+        path = bidirectional_search(source, target, graph.neighbors, stats, prune)
+        if path is None or len(path) >= upper:
+            return through
+        return [source] + [person for _, person in path]
+
+
+def build_index(graph, count):
+    """
+    Builds a LandmarkIndex over the `count` people who starred in the
+    most movies.
+    """
+    offsets = graph.person_offsets
+    people = len(graph.person_ids)
+    landmarks = sorted(
+        range(people),
+        key=lambda person: offsets[person + 1] - offsets[person],
+        reverse=True
+    )[:count]
+
+    distances = []
+    parents = []
+    for landmark in landmarks:
+        tree_distances, tree_parents = _search_tree(graph, landmark)
+        distances.append(tree_distances)
+        parents.append(tree_parents)
+    return LandmarkIndex(landmarks, distances, parents)
+
+
+def _search_tree(graph, root):
+    """
+    Breadth-first search from `root` over the bipartite graph. Each
+    movie's cast is scanned only once, however many of its stars are
+    reached.
+    """
+    people = len(graph.person_ids)
+    distances = array("H", [UNREACHED]) * people
+    parents = array(INDEX, [-1]) * people
+    seen_movies = bytearray(len(graph.movie_ids))
+    movie_offsets, movie_people = graph.movie_offsets, graph.movie_people
+
+    distances[root] = 0
+    layer = [root]
+    depth = 0
+    while layer:
+        depth += 1
+        next_layer = []
+        for person in layer:
+            for movie in graph.movies_of(person):
+                if seen_movies[movie]:
+                    continue
+                seen_movies[movie] = 1
+                for other in movie_people[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                    if distances[other] == UNREACHED:
+                        distances[other] = min(depth, UNREACHED - 1)
+                        parents[other] = person
+                        next_layer.append(other)
+        layer = next_layer
+    return distances, parents
+
+
+def index_path(directory):
+    """
+    Returns the path of the landmark index file for `directory`.
+    """
+    return os.path.join(directory, ".degrees.landmarks.snapshot")
+
+
+def graph_identity(graph):
+    """
+    Returns a digest of the person numbering and adjacency of `graph`.
+    An index stores raw person indexes, so it is only valid for a graph
+    numbered exactly like the one it was built on.
+    """
+    digest = hashlib.sha1()
+    digest.update("\n".join(graph.person_ids).encode("utf-8"))
+    digest.update(memoryview(graph.person_offsets).cast("B"))
+    digest.update(memoryview(graph.person_movies).cast("B"))
+    return digest.hexdigest()
+
+
+def save_index(directory, graph, index):
+    """
+    Writes `index`, built on `graph`, alongside the dataset in `directory`.
+    """
+    arrays = []
+    for i in range(len(index.landmarks)):
+        arrays.append((f"distances{i}", index.distances[i]))
+        arrays.append((f"parents{i}", index.parents[i]))
+    payload = (graph_identity(graph), index.landmarks)
+    snapshot.write_file(index_path(directory), directory, payload, arrays)
+
+
+def load_index(directory, graph, count):
+    """
+    Returns the landmark index stored for `directory` if it is up to
+    date, was built on a graph numbered like `graph` and has `count`
+    landmarks, otherwise None.
+    """
+    contents = snapshot.read_file(index_path(directory), directory)
+    if contents is None:
+        return None
+    payload, arrays = contents
+    if not isinstance(payload, tuple) or len(payload) != 2:
+        return None
+    identity, landmarks = payload
+    if identity != graph_identity(graph) or len(landmarks) != count:
+        return None
+    return LandmarkIndex(
+        landmarks,
+        [arrays[f"distances{i}"] for i in range(count)],
+        [arrays[f"parents{i}"] for i in range(count)]
+    )
+
+
+def attach_index(directory, graph, count, cache=False):
+    """
+    Gives `graph` a landmark index with `count` landmarks, reusing the
+    stored one when `cache` is set and saving a freshly built one.
+    """
+    index = load_index(directory, graph, count) if cache else None
+    if index is None:
+        index = build_index(graph, count)
+        if cache:
+            try:
+                save_index(directory, graph, index)
+            except OSError:
+                pass
+    graph.landmarks = index
+    return index
@@ -0,0 +1,134 @@
+"""
+Prefix and approximate lookups over the lowercased names in degrees.
+
+Names are kept in one sorted list, so every name starting with a prefix
+is a contiguous run found with `bisect`. Approximate lookups go through
+a trigram index: only names sharing the most trigrams with the query are
+scored with `difflib`, never the whole list.
+"""
+
+import difflib
+import os
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+import snapshot
+from compact import INDEX
+
+
+class NameIndex():
+    def __init__(self, keys, trigrams, postings):
+        # Sorted, distinct lowercased names
+        self.keys = keys
+
+        # Trigram -> (start, end) of its name positions in `postings`
+        self.trigrams = trigrams
+        self.postings = postings
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to `limit` names starting with `prefix`, in order.
+        """
+        prefix = prefix.lower()
+        matches = []
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and len(matches) < limit:
+            if not self.keys[i].startswith(prefix):
+                break
+            matches.append(self.keys[i])
+            i += 1
+        return matches
+
+    def fuzzy(self, query, limit=10, cutoff=0.6):
+        """
+        Returns up to `limit` names similar to `query`, best first.
+        """
+        query = query.lower()
+        shared = Counter()
+        for trigram in _trigrams(query):
+            span = self.trigrams.get(trigram)
+            if span is not None:
+                shared.update(self.postings[span[0]:span[1]])
+
+        # Only the names with the most trigrams in common are scored
+        scored = []
+        matcher = difflib.SequenceMatcher(b=query)
+        for position, _ in shared.most_common(max(limit * 20, 100)):
+            matcher.set_seq1(self.keys[position])
+            if matcher.real_quick_ratio() < cutoff or matcher.quick_ratio() < cutoff:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= cutoff:
+                scored.append((-ratio, self.keys[position]))
+        scored.sort()
+        return [name for _, name in scored[:limit]]
+
+    def search(self, query, limit=10):
+        """
+        Returns names matching `query`: the exact name if there is one,
+        else names it is a prefix of, else names similar to it.
+        """
+        query = query.lower()
+        i = bisect_left(self.keys, query)
+        if i < len(self.keys) and self.keys[i] == query:
+            return [query]
+        return self.prefix(query, limit) or self.fuzzy(query, limit)
+
+
+def build_index(names):
+    """
+    Builds a NameIndex over the keys of the `names` mapping.
+    """
+    keys = sorted(names)
+    grouped = {}
+    for position, key in enumerate(keys):
+        for trigram in _trigrams(key):
+            grouped.setdefault(trigram, array(INDEX)).append(position)
+
+    # Concatenate every posting list into one array
+    trigrams = {}
+    postings = array(INDEX)
+    for trigram, positions in grouped.items():
+        trigrams[trigram] = (len(postings), len(postings) + len(positions))
+        postings.extend(positions)
+    return NameIndex(keys, trigrams, postings)
+
+
+def index_path(directory):
+    """
+    Returns the path of the name index file for `directory`.
+    """
+    return os.path.join(directory, ".degrees.names.snapshot")
+
+
+def load_or_build(directory, names, cache=False):
+    """
+    Returns a NameIndex for `names`, reusing the one stored for
+    `directory` when `cache` is set and saving a freshly built one.
+    """
+    if cache:
+        contents = snapshot.read_file(index_path(directory), directory)
+        if contents is not None:
+            (keys, trigrams), arrays = contents
+            return NameIndex(keys, trigrams, arrays["postings"])
+
+    index = build_index(names)
+    if cache:
+        try:
+            snapshot.write_file(
+                index_path(directory), directory,
+                (index.keys, index.trigrams), [("postings", index.postings)]
+            )
+        except OSError:
+            pass
+    return index
+
+
+def _trigrams(text):
+    """
+    Returns the distinct trigrams of `text`, padded so that the start
+    and end of the name count as well.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
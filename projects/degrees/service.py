@@ -0,0 +1,237 @@
+"""
+Batch and server front ends for degrees.
+
+The dataset is loaded once per process and kept resident while
+`shortest_path` queries are answered from a pool of worker processes.
+Queries are a source and target separated by a tab, each either a name
+or an IMDB person id. Every answer is written as one line of JSON.
+
+Usage:
+    python service.py DIRECTORY batch PAIRS [--output FILE]
+    python service.py DIRECTORY serve [--port PORT]
+"""
+
+import argparse
+import json
+import os
+import socketserver
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+
+
+def resolve(query):
+    """
+    Returns the single person id meant by `query` (an id or a name)
+    and a list of candidate ids, which is empty unless it is ambiguous.
+
+    With a name index loaded, a partial or misspelt name resolves to
+    whoever it matches, as long as that is exactly one person.
+    """
+    if query in degrees.people:
+        return query, []
+    person_ids = sorted(degrees.names.get(query.lower(), set()))
+    if not person_ids and degrees.name_index is not None:
+        person_ids = sorted(
+            person_id
+            for name in degrees.name_index.search(query)
+            for person_id in degrees.names[name]
+        )
+    if len(person_ids) == 1:
+        return person_ids[0], []
+    return None, person_ids
+
+
+def answer(line):
+    """
+    Answers one tab-separated query line with a JSON-ready dictionary.
+    """
+    fields = line.rstrip("\r\n").split("\t")
+    if len(fields) != 2:
+        return {"query": line.rstrip("\r\n"), "error": "expected two tab-separated names"}
+
+    result = {"source": fields[0], "target": fields[1]}
+    ids = []
+    for field in fields:
+        person_id, candidates = resolve(field)
+        if person_id is None:
+            result["error"] = "ambiguous name" if candidates else "person not found"
+            result["candidates"] = candidates
+            result["name"] = field
+            return result
+        ids.append(person_id)
+
+    path = degrees.shortest_path(ids[0], ids[1], bidirectional=True)
+    if path is None:
+        result["degrees"] = None
+        result["path"] = None
+    else:
+        result["degrees"] = len(path)
+        result["path"] = [
+            {"movie": movie_id, "person": person_id}
+            for movie_id, person_id in path
+        ]
+    return result
+
+
+def init_worker(directory, compact, landmarks, index_names):
+    """
+    Loads the dataset in a worker process unless it was inherited.
+    """
+    if not degrees.people:
+        degrees.load_data(
+            directory, compact=compact, cache=True,
+            landmarks=landmarks, index_names=index_names
+        )
+
+
+def answers(pool, lines, window):
+    """
+    Yields answers for `lines` in order, keeping at most `window`
+    queries in flight so memory stays bounded on long inputs.
+    """
+    pending = deque()
+    for line in lines:
+        if not line.strip():
+            continue
+        if pool is None:
+            yield answer(line)
+            continue
+        pending.append(pool.submit(answer, line))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def run_batch(pool, pairs, output, window):
+    """
+    Streams answers for every query in the `pairs` file to `output`.
+    """
+    with open(pairs, encoding="utf-8") as f:
+        for result in answers(pool, f, window):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+
+
+def serve_stdin(pool, window):
+    """
+    Answers queries from standard input until it is closed. Each answer
+    is written as soon as it is ready, so they may arrive out of order.
+    """
+    lock = threading.Lock()
+    slots = threading.BoundedSemaphore(window)
+
+    def write(result):
+        with lock:
+            sys.stdout.write(json.dumps(result) + "\n")
+            sys.stdout.flush()
+
+    def done(future):
+        slots.release()
+        write(future.result())
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        if pool is None:
+            write(answer(line))
+            continue
+        slots.acquire()
+        pool.submit(answer, line).add_done_callback(done)
+
+    # Wait for the queries still in flight
+    for _ in range(window):
+        slots.acquire()
+
+
+def serve_socket(pool, host, port):
+    """
+    Answers queries over TCP, one thread per connection, with the
+    searches themselves spread over `pool`.
+    """
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for raw in self.rfile:
+                line = raw.decode("utf-8")
+                if not line.strip():
+                    continue
+                if pool is None:
+                    result = answer(line)
+                else:
+                    result = pool.submit(answer, line).result()
+                self.wfile.write((json.dumps(result) + "\n").encode("utf-8"))
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    with socketserver.ThreadingTCPServer((host, port), Handler) as server:
+        print(f"Serving on {host}:{server.server_address[1]}", file=sys.stderr)
+        server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer degrees queries in bulk.")
+    parser.add_argument("directory")
+    parser.add_argument("--compact", action="store_true",
+                        help="load into the integer-indexed graph")
+    parser.add_argument("--landmarks", type=int, default=0,
+                        help="build a landmark index over this many people (needs --compact)")
+    parser.add_argument("--name-index", action="store_true",
+                        help="resolve partial and misspelt names")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (0 answers queries in-process)")
+    parser.add_argument("--load-workers", type=int, default=os.cpu_count(),
+                        help="processes parsing the CSV files on a cold start")
+    modes = parser.add_subparsers(dest="mode", required=True)
+
+    batch = modes.add_parser("batch", help="answer a file of tab-separated pairs")
+    batch.add_argument("pairs")
+    batch.add_argument("--output", help="write answers here instead of stdout")
+
+    serve = modes.add_parser("serve", help="answer queries until stopped")
+    serve.add_argument("--port", type=int,
+                       help="listen on this local TCP port instead of stdin")
+    serve.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+    if args.landmarks and not args.compact:
+        parser.error("--landmarks needs --compact")
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(
+        args.directory, compact=args.compact, cache=True,
+        landmarks=args.landmarks, index_names=args.name_index,
+        workers=args.load_workers, progress=degrees.print_progress
+    )
+    print("Data loaded.", file=sys.stderr)
+
+    pool = None
+    if args.workers > 0:
+        pool = ProcessPoolExecutor(
+            max_workers=args.workers,
+            initializer=init_worker,
+            initargs=(args.directory, args.compact, args.landmarks, args.name_index)
+        )
+    window = 4 * max(args.workers, 1)
+
+    try:
+        if args.mode == "batch":
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as output:
+                    run_batch(pool, args.pairs, output, window)
+            else:
+                run_batch(pool, args.pairs, sys.stdout, window)
+        elif args.port is None:
+            serve_stdin(pool, window)
+        else:
+            serve_socket(pool, args.host, args.port)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    main()
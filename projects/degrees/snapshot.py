@@ -0,0 +1,152 @@
+"""
+Binary snapshots of loaded degrees data, so repeat launches can skip
+parsing the CSV files.
+
+A snapshot file is laid out as:
+
+    MAGIC, VERSION         (8 bytes)
+    header length          (8 bytes, little-endian)
+    pickled header         (fingerprint, payload, array table)
+    raw index arrays       (CompactGraph only, 8-byte aligned)
+
+The CompactGraph's CSR arrays are memory-mapped straight out of the
+file rather than copied. A snapshot is ignored whenever the size or
+modification time of any CSV file no longer matches its fingerprint.
+"""
+
+import mmap
+import os
+import pickle
+import sys
+from array import array
+
+import compact as compact_module
+
+MAGIC = b"DEGS"
+VERSION = 2
+
+FILES = ("people.csv", "movies.csv", "stars.csv")
+ARRAYS = ("person_offsets", "person_movies", "movie_offsets", "movie_people")
+
+
+def snapshot_path(directory, compact=False):
+    """
+    Returns the path of the snapshot file for `directory`.
+    """
+    kind = "compact" if compact else "dict"
+    return os.path.join(directory, f".degrees.{kind}.snapshot")
+
+
+def fingerprint(directory):
+    """
+    Returns the (name, size, mtime) of every CSV file in `directory`.
+    """
+    stats = []
+    for filename in FILES:
+        stat = os.stat(os.path.join(directory, filename))
+        stats.append((filename, stat.st_size, stat.st_mtime_ns))
+    return (sys.byteorder, array(compact_module.INDEX).itemsize, tuple(stats))
+
+
+def save_snapshot(directory, data, compact=False):
+    """
+    Writes `data` to the snapshot file for `directory`. `data` is
+    either a CompactGraph or a (names, people, movies) tuple.
+    """
+    if compact:
+        # The landmark index is saved separately by landmarks.py
+        payload = {
+            key: value for key, value in vars(data).items()
+            if key not in ARRAYS and key != "landmarks"
+        }
+        arrays = [(name, getattr(data, name)) for name in ARRAYS]
+    else:
+        payload = data
+        arrays = []
+    write_file(snapshot_path(directory, compact), directory, payload, arrays)
+
+
+def load_snapshot(directory, compact=False):
+    """
+    Returns the data stored in the snapshot file for `directory`,
+    or None if there is no snapshot or it is out of date.
+    """
+    contents = read_file(snapshot_path(directory, compact), directory)
+    if contents is None:
+        return None
+    payload, arrays = contents
+    if not compact:
+        return payload
+
+    graph = compact_module.CompactGraph()
+    vars(graph).update(payload)
+    vars(graph).update(arrays)
+    return graph
+
+
+def write_file(path, directory, payload, arrays):
+    """
+    Writes `payload` and the named `arrays` to `path` in snapshot
+    format, stamped with the fingerprint of `directory`.
+    """
+    # Lay the arrays out after the header; offsets are relative to the
+    # end of the header so they do not depend on its own size
+    table = {}
+    offset = 0
+    for name, values in arrays:
+        view = memoryview(values)
+        offset = _aligned(offset)
+        table[name] = (offset, view.nbytes, view.format)
+        offset += view.nbytes
+
+    header = pickle.dumps(
+        (fingerprint(directory), payload, table),
+        protocol=pickle.HIGHEST_PROTOCOL
+    )
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC + VERSION.to_bytes(4, "little"))
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        start = _aligned(f.tell())
+        for name, values in arrays:
+            f.write(b"\0" * (start + table[name][0] - f.tell()))
+            f.write(memoryview(values).cast("B"))
+    os.replace(temporary, path)
+
+
+def read_file(path, directory):
+    """
+    Returns the payload of the snapshot file at `path` and a dictionary
+    of its arrays memory-mapped as typed memoryviews, or None if the file
+    is missing, unreadable or out of date with `directory`.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+
+    with f:
+        if f.read(8) != MAGIC + VERSION.to_bytes(4, "little"):
+            return None
+        length = int.from_bytes(f.read(8), "little")
+        try:
+            stored, payload, table = pickle.loads(f.read(length))
+        except (pickle.UnpicklingError, EOFError, ValueError):
+            return None
+        if stored != fingerprint(directory):
+            return None
+
+        arrays = {}
+        if table:
+            start = _aligned(16 + length)
+            buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            for name, (offset, size, typecode) in table.items():
+                view = buffer[start + offset:start + offset + size]
+                arrays[name] = view.cast(typecode)
+        return payload, arrays
+
+
+def _aligned(position):
+    return position + (-position % 8)
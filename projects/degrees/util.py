@@ -1,4 +1,10 @@
+import time
+from collections import deque
+
+
 class Node():
+    __slots__ = ("state", "parent", "action")
+
     def __init__(self, state, parent, action):
         self.state = state
         self.parent = parent
@@ -7,24 +13,33 @@ class Node():
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+        # Counts of each state currently in the frontier, for O(1) lookups
+        self.states = {}
 
     def add(self, node):
         self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
 
+    def _discard(self, node):
+        count = self.states[node.state]
+        if count == 1:
+            del self.states[node.state]
+        else:
+            self.states[node.state] = count - 1
+        return node
+
     def remove(self):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
-            return node
+            return self._discard(self.frontier.pop())
 
 
 class QueueFrontier(StackFrontier):
@@ -33,6 +48,141 @@ class QueueFrontier(StackFrontier):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
+            return self._discard(self.frontier.popleft())
+
+
+class SearchStats():
+    """
+    Counters and timers for one or more searches. Pass an instance as
+    `stats` to a search to have it filled in.
+    """
+    def __init__(self):
+        self.searches = 0
+        self.expanded = 0
+        self.frontier_peak = 0
+        self.neighbor_seconds = 0.0
+        self.seconds = 0.0
+        self._started = None
+
+    def start(self):
+        self.searches += 1
+        self._started = time.perf_counter()
+
+    def stop(self):
+        self.seconds += time.perf_counter() - self._started
+
+    def neighbors(self, neighbors):
+        """
+        Wraps a `neighbors` function so every call counts as one state
+        expanded and the time spent in it is recorded.
+        """
+        def timed(state):
+            started = time.perf_counter()
+            result = list(neighbors(state))
+            self.neighbor_seconds += time.perf_counter() - started
+            self.expanded += 1
+            return result
+        return timed
+
+    def frontier(self, size):
+        if size > self.frontier_peak:
+            self.frontier_peak = size
+
+    def as_dict(self):
+        return {
+            "searches": self.searches,
+            "expanded": self.expanded,
+            "frontier_peak": self.frontier_peak,
+            "neighbor_seconds": self.neighbor_seconds,
+            "seconds": self.seconds
+        }
+
+
+def bidirectional_search(source, target, neighbors, stats=None, prune=None):
+    """
+    Breadth-first search grown from both `source` and `target`,
+    always expanding one whole layer of the smaller frontier.
+    `neighbors(state)` must return (action, state) pairs and the
+    graph must be undirected.
+
+    If given, `prune(state, depth, forward)` is asked about every state
+    in a layer just before the layer is expanded, and states it returns
+    True for are not expanded. It must not prune any state on a path the
+    caller wants found. States in the last layers, which are never
+    expanded, are never asked about.
+
+    Returns the list of (action, state) pairs leading from `source`
+    to `target`, or None if they are not connected.
+    """
+    if source == target:
+        return []
+    if stats is not None:
+        neighbors = stats.neighbors(neighbors)
+
+    #Each side maps a state to (depth, neighbouring state, action joining them)
+    forward = {source: (0, None, None)}
+    backward = {target: (0, None, None)}
+    forward_layer = [source]
+    backward_layer = [target]
+
+    while forward_layer and backward_layer:
+        #Expand whichever side has fewer states waiting
+        expand_forward = len(forward_layer) <= len(backward_layer)
+        if expand_forward:
+            layer, visited, other = forward_layer, forward, backward
+        else:
+            layer, visited, other = backward_layer, backward, forward
+        if prune is not None:
+            layer = [
+                state for state in layer
+                if not prune(state, visited[state][0], expand_forward)
+            ]
+
+        next_layer = []
+        best = None
+        for state in layer:
+            depth = visited[state][0]
+            for action, neighbor in neighbors(state):
+                if neighbor in visited:
+                    continue
+                visited[neighbor] = (depth + 1, state, action)
+                next_layer.append(neighbor)
+                #Keep the shortest meeting point found in this layer
+                if neighbor in other:
+                    length = depth + 1 + other[neighbor][0]
+                    if best is None or length < best[0]:
+                        best = (length, neighbor)
+
+        if best is not None:
+            return _join_paths(forward, backward, best[1])
+
+        if expand_forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+        if stats is not None:
+            stats.frontier(len(forward_layer) + len(backward_layer))
+
+    return None
+
+
+def _join_paths(forward, backward, meeting):
+    """
+    Stitches the two halves of `bidirectional_search` together at
+    `meeting` into (action, state) pairs.
+    """
+    pairs = []
+    state = meeting
+    while forward[state][1] is not None:
+        _, parent, action = forward[state]
+        pairs.append((action, state))
+        state = parent
+    pairs.reverse()
+
+    state = meeting
+    while backward[state][1] is not None:
+        _, next_state, action = backward[state]
+        pairs.append((action, next_state))
+        state = next_state
+
+    return pairs
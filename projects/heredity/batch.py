@@ -0,0 +1,140 @@
+"""
+Batch front end for heredity.
+
+Scores many families in one process tree instead of one interpreter per
+family. The input is either a directory of family CSV files, each in the
+format heredity.py reads, or one CSV file with an extra `family` column
+whose rows are grouped by family. Families are read one at a time and
+handed to a pool of worker processes, and every person's marginals are
+written, in input order, to a single CSV file.
+
+Usage: python batch.py INPUT OUTPUT [--method METHOD] [--workers N]
+"""
+
+import argparse
+import csv
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import heredity
+
+FIELDS = ("family", "name", "gene_2", "gene_1", "gene_0", "trait")
+
+# Methods that start their own process pool cannot run inside a worker
+METHODS = [method for method in heredity.METHODS if method != "parallel"]
+
+
+def families(source):
+    """
+    Yield (family, people) for every family in `source`, a directory of
+    family CSV files or a multi-family CSV file.
+    """
+    if os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            if filename.endswith(".csv"):
+                family = os.path.splitext(filename)[0]
+                yield family, heredity.load_data(os.path.join(source, filename))
+        return
+
+    with open(source, newline="") as f:
+        reader = csv.DictReader(f)
+        if "family" not in (reader.fieldnames or ()):
+            raise ValueError(f"{source} has no family column")
+
+        # Rows are grouped by family, so a family is done when the next starts
+        seen = set()
+        family = None
+        rows = []
+        for row in reader:
+            if row["family"] != family:
+                if rows:
+                    yield family, heredity.read_people(rows)
+                family = row["family"]
+                if family in seen:
+                    raise ValueError(f"rows for family {family} are not together")
+                seen.add(family)
+                rows = []
+            rows.append(row)
+        if rows:
+            yield family, heredity.read_people(rows)
+
+
+def score(family, people, method):
+    """
+    Return `family` and its probabilities, or an error message in their
+    place if the family could not be scored.
+    """
+    try:
+        return family, heredity.METHODS[method](people)
+    except (KeyError, ValueError) as error:
+        return family, f"{type(error).__name__}: {error}"
+
+
+def results(pool, families, method, window):
+    """
+    Yields scored families in order, keeping at most `window` in flight
+    so memory stays bounded on long inputs.
+    """
+    pending = deque()
+    for family, people in families:
+        if pool is None:
+            yield score(family, people, method)
+            continue
+        pending.append(pool.submit(score, family, people, method))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def write_family(writer, family, probabilities):
+    """
+    Writes a row of marginals for every person in `probabilities`.
+    """
+    for person, distributions in probabilities.items():
+        genes = distributions["gene"]
+        writer.writerow([
+            family, person,
+            f"{genes[2]:.6f}", f"{genes[1]:.6f}", f"{genes[0]:.6f}",
+            f"{distributions['trait'][True]:.6f}"
+        ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score many heredity families at once.")
+    parser.add_argument("input", help="directory of family CSV files, or a CSV with a family column")
+    parser.add_argument("output", help="CSV file to write every person's marginals to")
+    parser.add_argument("--method", choices=METHODS, default="eliminate")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="worker processes (0 scores families in-process)")
+    args = parser.parse_args()
+
+    pool = None
+    if args.workers > 0:
+        pool = ProcessPoolExecutor(max_workers=args.workers)
+    window = 4 * max(args.workers, 1)
+
+    scored = failed = 0
+    try:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            for family, probabilities in results(pool, families(args.input), args.method, window):
+                if isinstance(probabilities, str):
+                    print(f"Skipping family {family}: {probabilities}", file=sys.stderr)
+                    failed += 1
+                    continue
+                write_family(writer, family, probabilities)
+                scored += 1
+    except ValueError as error:
+        sys.exit(str(error))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    print(f"Scored {scored} families, skipped {failed}.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Exact inference for heredity by variable elimination.
+
+A family is compiled into factors over each person's number of gene
+copies: the unconditional gene distribution for people without parents,
+the inheritance table for everyone else, and the trait table as evidence
+wherever a trait is known. Traits that are not known sum to one and drop
+out. Eliminating the gene variables one at a time, in an order that
+keeps the factors small, builds a tree of cliques; passing messages up
+and back down that tree gives every person's marginal in two sweeps,
+so the work grows linearly with the size of the family rather than
+exponentially as with enumeration.
+"""
+
+import heapq
+import itertools
+
+GENES = (0, 1, 2)
+
+# Most people a clique may link besides the one eliminated; a clique's
+# factor has 3 ** (width + 1) entries, so wider ones exhaust memory
+MAX_WIDTH = 12
+
+
+class Factor():
+    """
+    A non-negative function of some people's gene counts, stored as a
+    table from a tuple of their counts (in `variables` order) to a value.
+    """
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+    @classmethod
+    def product(cls, factors, keep):
+        """
+        Multiplies `factors` together and sums out every variable not
+        in `keep`, without building the full product table.
+        """
+        variables = []
+        for factor in factors:
+            for variable in factor.variables:
+                if variable not in variables:
+                    variables.append(variable)
+        keep = tuple(variable for variable in variables if variable in keep)
+
+        lookups = [
+            (factor.table, [variables.index(variable) for variable in factor.variables])
+            for factor in factors
+        ]
+        kept = [variables.index(variable) for variable in keep]
+
+        table = dict.fromkeys(itertools.product(GENES, repeat=len(keep)), 0.0)
+        for values in itertools.product(GENES, repeat=len(variables)):
+            p = 1.0
+            for factor_table, positions in lookups:
+                p *= factor_table[tuple(values[i] for i in positions)]
+                if not p:
+                    break
+            if p:
+                table[tuple(values[i] for i in kept)] += p
+        return cls(keep, table)
+
+    def normalize(self):
+        """
+        Scales the table to sum to one and returns the factor. Messages
+        only matter up to a constant, and without this their values
+        underflow to zero in large families.
+        """
+        total = sum(self.table.values())
+        for values in self.table:
+            self.table[values] /= total
+        return self
+
+
+def inheritance(mutation):
+    """
+    Return the table of P(child genes | mother genes, father genes).
+    """
+    passes = {2: 1 - mutation, 1: 0.5, 0: mutation}
+    table = {}
+    for mother, father in itertools.product(GENES, repeat=2):
+        m, f = passes[mother], passes[father]
+        table[(2, mother, father)] = m * f
+        table[(1, mother, father)] = m * (1 - f) + (1 - m) * f
+        table[(0, mother, father)] = (1 - m) * (1 - f)
+    return table
+
+
+def compile_factors(people, probs):
+    """
+    Return the factors of the gene variables of `people`, with known
+    traits folded in as evidence.
+    """
+    factors = []
+    children = inheritance(probs["mutation"])
+    for person in people:
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        if not mother and not father:
+            factors.append(Factor((person,), {(g,): probs["gene"][g] for g in GENES}))
+        else:
+            factors.append(Factor((person, mother, father), children))
+
+        trait = people[person]["trait"]
+        if trait is not None:
+            factors.append(Factor((person,), {(g,): probs["trait"][g][trait] for g in GENES}))
+    return factors
+
+
+def elimination_order(people, factors):
+    """
+    Return an order to eliminate every person in, greedily choosing
+    whoever currently shares a factor with the fewest others. Raise
+    ValueError if that order needs a clique wider than `MAX_WIDTH`.
+    """
+    neighbors = {person: set() for person in people}
+    for factor in factors:
+        for variable in factor.variables:
+            neighbors[variable].update(factor.variables)
+    for person in neighbors:
+        neighbors[person].discard(person)
+
+    # Entries go stale as neighbors change and are skipped when popped
+    heap = [(len(linked), person) for person, linked in neighbors.items()]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        degree, person = heapq.heappop(heap)
+        if person not in neighbors or degree != len(neighbors[person]):
+            continue
+        linked = neighbors.pop(person)
+        if len(linked) > MAX_WIDTH:
+            raise ValueError(
+                f"family is too interrelated to eliminate: {person} would "
+                f"link {len(linked)} people, more than {MAX_WIDTH}"
+            )
+        # Eliminating a person connects everyone they were connected to
+        for other in linked:
+            neighbors[other].discard(person)
+            neighbors[other].update(linked - {other})
+            heapq.heappush(heap, (len(neighbors[other]), other))
+        order.append(person)
+    return order
+
+
+def gene_marginals(people, factors, order):
+    """
+    Return {person: {genes: probability}} for every person, by variable
+    elimination in `order` followed by message passing back down the
+    resulting clique tree.
+    """
+    # Factors not yet used, by key, each with the clique that produced it
+    # (or None), and the keys of the ones each person appears in
+    pool = {}
+    containing = {person: set() for person in people}
+    keys = itertools.count()
+
+    def add(factor, origin):
+        key = next(keys)
+        pool[key] = (factor, origin)
+        for variable in factor.variables:
+            containing[variable].add(key)
+
+    for factor in factors:
+        add(factor, None)
+
+    cliques = []
+    for person in order:
+        used = []
+        for key in sorted(containing.pop(person)):
+            factor, origin = pool.pop(key)
+            for variable in factor.variables:
+                if variable != person:
+                    containing[variable].discard(key)
+            used.append((factor, origin))
+
+        own = [factor for factor, origin in used if origin is None]
+        children = [origin for _, origin in used if origin is not None]
+        incoming = own + [cliques[child]["up"] for child in children]
+        scope = set().union(*(factor.variables for factor in incoming)) - {person}
+
+        cliques.append({
+            "person": person,
+            "factors": own,
+            "children": children,
+            "parent": None,
+            "up": Factor.product(incoming, scope).normalize(),
+            "down": None
+        })
+        add(cliques[-1]["up"], len(cliques) - 1)
+        for child in children:
+            cliques[child]["parent"] = len(cliques) - 1
+
+    # Parents come after their children, so walk back from the roots
+    for clique in reversed(cliques):
+        parent = clique["parent"]
+        if parent is None:
+            continue
+        parent = cliques[parent]
+        messages = parent["factors"] + [
+            cliques[child]["up"] for child in parent["children"]
+            if cliques[child] is not clique
+        ]
+        if parent["down"] is not None:
+            messages.append(parent["down"])
+        clique["down"] = Factor.product(messages, clique["up"].variables).normalize()
+
+    marginals = {}
+    for clique in cliques:
+        messages = clique["factors"] + [cliques[child]["up"] for child in clique["children"]]
+        if clique["down"] is not None:
+            messages.append(clique["down"])
+        belief = Factor.product(messages, (clique["person"],)).normalize()
+        marginals[clique["person"]] = {g: belief.table[(g,)] for g in GENES}
+    return marginals
+
+
+def infer(people, probs):
+    """
+    Return the gene and trait distribution of every person in `people`,
+    in the `probabilities` format used by heredity.py, already normalized.
+    """
+    factors = compile_factors(people, probs)
+    genes = gene_marginals(people, factors, elimination_order(people, factors))
+
+    probabilities = {}
+    for person in people:
+        trait = people[person]["trait"]
+        if trait is None:
+            # An unknown trait depends only on the person's own genes
+            has_trait = sum(genes[person][g] * probs["trait"][g][True] for g in GENES)
+        else:
+            has_trait = float(trait)
+        probabilities[person] = {
+            "gene": {2: genes[person][2], 1: genes[person][1], 0: genes[person][0]},
+            "trait": {True: has_trait, False: 1 - has_trait}
+        }
+    return probabilities
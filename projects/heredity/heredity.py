@@ -1,6 +1,12 @@
+import argparse
 import csv
 import itertools
-import sys
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import elimination
+import sampling
+import vectorized
 
 PROBS = {
 
@@ -40,12 +46,86 @@ PROBS = {
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    parser = argparse.ArgumentParser(description="Infer gene and trait probabilities for a family.")
+    parser.add_argument("data", help="CSV file of name, mother, father, trait")
+    parser.add_argument("--method", choices=METHODS, default="enumerate",
+                        help="how to compute the probabilities; likelihood and gibbs "
+                             "sample, the rest are exact but only eliminate scales to "
+                             "large families")
+    parser.add_argument("--samples", type=int, default=100000,
+                        help="most samples to draw when sampling")
+    parser.add_argument("--tolerance", type=float,
+                        help="stop sampling once the standard error is below this")
+    parser.add_argument("--processes", type=int, default=0,
+                        help="worker processes to sample or enumerate in "
+                             "(parallel defaults to one per core)")
+    args = parser.parse_args()
+    people = load_data(args.data)
+
+    if args.method in sampling.SAMPLERS:
+        probabilities = METHODS[args.method](
+            people, args.samples, args.tolerance, args.processes
+        )
+    elif args.method == "parallel":
+        probabilities = parallel_probabilities(people, args.processes)
+    else:
+        probabilities = METHODS[args.method](people)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
+
+def enumerate_probabilities(people):
+    """
+    Return the gene and trait distribution of every person in `people`
+    by summing the joint probability of every possible assignment.
+    """
+    probabilities = enumerate_shard(people, trait_gene_sets(people))
+
+    # Ensure probabilities sum to 1
+    normalize(probabilities)
+    return probabilities
+
+
+def parallel_probabilities(people, processes=0):
+    """
+    Return the same distributions as `enumerate_probabilities`, with
+    the enumeration split into shards summed in `processes` worker
+    processes (one per core by default).
+    """
+    processes = processes or os.cpu_count() or 1
+
+    # Interleave the (have_trait, one_gene) pairs over a few shards per
+    # process, so shards cost about the same and none is left for last
+    pairs = list(trait_gene_sets(people))
+    count = min(len(pairs), processes * 4)
+    shards = [pairs[i::count] for i in range(count)]
+
+    probabilities = empty_probabilities(people)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for partial in pool.map(enumerate_shard, [people] * count, shards):
+            for person in partial:
+                for field in partial[person]:
+                    for value, p in partial[person][field].items():
+                        probabilities[person][field][value] += p
+
+    # Ensure probabilities sum to 1
+    normalize(probabilities)
+    return probabilities
+
+
+def empty_probabilities(people):
+    """
+    Return a gene and trait distribution for every person in `people`
+    with every probability zero.
+    """
+    return {
         person: {
             "gene": {
                 2: 0,
@@ -60,6 +140,13 @@ def main():
         for person in people
     }
 
+
+def trait_gene_sets(people):
+    """
+    Yield every (have_trait, one_gene) pair of sets of people to
+    enumerate, skipping trait sets that contradict known traits.
+    """
+
     # Loop over all sets of people who might have the trait
     names = set(people)
     for have_trait in powerset(names):
@@ -75,23 +162,128 @@ def main():
 
         # Loop over all sets of people who might have the gene
         for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
+            yield have_trait, one_gene
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
 
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
+def enumerate_shard(people, pairs):
+    """
+    Return the unnormalized gene and trait distributions summed over
+    every assignment extending the (have_trait, one_gene) `pairs`.
+    """
+    probabilities = empty_probabilities(people)
+    names = set(people)
+    for have_trait, one_gene in pairs:
+        for two_genes in powerset(names - one_gene):
 
-    # Print results
+            # Update probabilities with new joint probability
+            p = joint_probability(people, one_gene, two_genes, have_trait)
+            update(probabilities, one_gene, two_genes, have_trait, p)
+    return probabilities
+
+
+def pruned_probabilities(people):
+    """
+    Return the gene and trait distribution of every person in `people`
+    by enumeration, pruned using what is known.
+
+    Only gene assignments are enumerated: known traits are fixed rather
+    than searched over, and unknown ones are summed out exactly for each
+    assignment. People are assigned parents first, depth-first, so the
+    product over everyone assigned so far is shared by every completion
+    of it, and each person's factor is looked up in a table built once.
+    """
+    order = vectorized.parents_first(people)
+    position = {person: i for i, person in enumerate(order)}
+
+    # Each person's gene probability times the chance of their known trait,
+    # by (own genes, mother's genes, father's genes) or just own genes
+    inherit = elimination.inheritance(PROBS["mutation"])
+    factors = []
+    parents = []
+    for person in order:
+        trait = people[person]["trait"]
+        evidence = {
+            genes: 1 if trait is None else PROBS["trait"][genes][trait]
+            for genes in PROBS["gene"]
+        }
+        mother = people[person]["mother"]
+        if mother:
+            parents.append((position[mother], position[people[person]["father"]]))
+            factors.append({
+                key: p * evidence[key[0]] for key, p in inherit.items()
+            })
+        else:
+            parents.append(None)
+            factors.append({
+                (genes,): p * evidence[genes] for genes, p in PROBS["gene"].items()
+            })
+
+    gene_totals = [{2: 0, 1: 0, 0: 0} for _ in order]
+    trait_totals = [0] * len(order)
+    assignment = [0] * len(order)
+
+    def assign(i, p):
+        if i == len(order):
+            for j, genes in enumerate(assignment):
+                gene_totals[j][genes] += p
+                trait_totals[j] += p * PROBS["trait"][genes][True]
+            return
+        for genes in (0, 1, 2):
+            key = (genes,) if parents[i] is None else (
+                genes, assignment[parents[i][0]], assignment[parents[i][1]]
+            )
+            q = p * factors[i][key]
+            if q:
+                assignment[i] = genes
+                assign(i + 1, q)
+
+    assign(0, 1)
+
+    probabilities = {}
     for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+        i = position[person]
+        total = sum(gene_totals[i].values())
+        trait = people[person]["trait"]
+        has_trait = trait_totals[i] if trait is None else total * trait
+        probabilities[person] = {
+            "gene": gene_totals[i],
+            "trait": {True: has_trait, False: total - has_trait}
+        }
+    normalize(probabilities)
+    return probabilities
+
+
+def vectorized_probabilities(people):
+    """
+    Return the gene and trait distribution of every person in `people`
+    by enumerating every gene assignment at once with NumPy (see
+    vectorized.py).
+    """
+    return vectorized.infer(people, PROBS)
+
+
+def likelihood_probabilities(people, samples=100000, tolerance=None, processes=0):
+    """
+    Return estimated gene and trait distributions of every person in
+    `people` by likelihood weighting (see sampling.py).
+    """
+    return sampling.infer(people, PROBS, "likelihood", samples, tolerance, processes)
+
+
+def gibbs_probabilities(people, samples=100000, tolerance=None, processes=0):
+    """
+    Return estimated gene and trait distributions of every person in
+    `people` by Gibbs sampling (see sampling.py).
+    """
+    return sampling.infer(people, PROBS, "gibbs", samples, tolerance, processes)
+
+
+def eliminate_probabilities(people):
+    """
+    Return the gene and trait distribution of every person in `people`
+    by variable elimination (see elimination.py).
+    """
+    return elimination.infer(people, PROBS)
 
 
 def load_data(filename):
@@ -101,18 +293,24 @@ def load_data(filename):
     mother, father must both be blank, or both be valid names in the CSV.
     trait should be 0 or 1 if trait is known, blank otherwise.
     """
-    data = dict()
     with open(filename) as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            name = row["name"]
-            data[name] = {
-                "name": name,
-                "mother": row["mother"] or None,
-                "father": row["father"] or None,
-                "trait": (True if row["trait"] == "1" else
-                          False if row["trait"] == "0" else None)
-            }
+        return read_people(csv.DictReader(f))
+
+
+def read_people(rows):
+    """
+    Build the `load_data` dictionary from CSV rows (as dictionaries).
+    """
+    data = dict()
+    for row in rows:
+        name = row["name"]
+        data[name] = {
+            "name": name,
+            "mother": row["mother"] or None,
+            "father": row["father"] or None,
+            "trait": (True if row["trait"] == "1" else
+                      False if row["trait"] == "0" else None)
+        }
     return data
 
 
@@ -248,15 +446,26 @@ def normalize(probabilities):
     is normalized (i.e., sums to 1, with relative proportions the same).
     """
     for person in probabilities:
-        gene_total = sum(probabilities[person]["gene"].values)
+        gene_total = sum(probabilities[person]["gene"].values())
         trait_total = sum(probabilities[person]["trait"].values())
         
         for gene in probabilities[person]["gene"]:
             probabilities[person]["gene"][gene] /= gene_total
         
-        for trait in probabilities["trait"][trait]:
+        for trait in probabilities[person]["trait"]:
             probabilities[person]["trait"][trait] /= trait_total
 
 
+METHODS = {
+    "enumerate": enumerate_probabilities,
+    "parallel": parallel_probabilities,
+    "prune": pruned_probabilities,
+    "vectorize": vectorized_probabilities,
+    "likelihood": likelihood_probabilities,
+    "gibbs": gibbs_probabilities,
+    "eliminate": eliminate_probabilities
+}
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,261 @@
+"""
+Approximate inference for heredity by sampling, for pedigrees too large
+for the exact methods.
+
+Two samplers over the gene variables, both using the `PROBS` tables:
+
+- Likelihood weighting draws everyone's genes parents first from the
+  model and weights each sample by how likely the known traits are.
+- Gibbs sampling runs Markov chains that redraw one person's genes at a
+  time given their parents, children and co-parents, with the known
+  traits as evidence.
+
+Likelihood weighting is cheaper per sample, but its weights collapse
+onto a few samples as the number of known traits grows. They are kept
+as logs so they do not underflow, but with hundreds of known traits the
+estimate rests on a handful of samples. Gibbs sampling is the one to
+use for large pedigrees with many known traits.
+
+Unknown traits are never sampled: each sample contributes its exact
+probability of the trait given the sampled genes instead. Samples are
+drawn in batches of many samples at once with NumPy; batches can run in
+a process pool, and drawing stops at a sample budget or once the
+standard error across batches falls below a tolerance.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import vectorized
+
+# Samples per batch, and Markov chains run side by side in a Gibbs batch
+BATCH = 10000
+CHAINS = 100
+
+# Gibbs sweeps discarded at the start of every batch
+BURN_IN = 50
+
+# Batches needed before their spread is trusted as an error estimate
+MIN_BATCHES = 4
+
+
+class Model():
+    """
+    A family laid out for sampling: people numbered parents first, with
+    their parents, children and known traits, and the `PROBS` tables as
+    arrays indexed by gene count.
+    """
+    def __init__(self, people, probs):
+        self.names = vectorized.parents_first(people)
+        index = {person: i for i, person in enumerate(self.names)}
+
+        self.parents = []
+        self.children = [[] for _ in self.names]
+        self.traits = []
+        for i, person in enumerate(self.names):
+            mother = people[person]["mother"]
+            if mother:
+                parents = (index[mother], index[people[person]["father"]])
+                self.children[parents[0]].append((i, 0, parents[1]))
+                self.children[parents[1]].append((i, 1, parents[0]))
+            else:
+                parents = None
+            self.parents.append(parents)
+            self.traits.append(people[person]["trait"])
+
+        self.prior, self.trait_table, self.inherit = vectorized.tables(probs)
+
+    def forward(self, rng, size):
+        """
+        Draw `size` gene assignments from the model, ignoring the known
+        traits. Return a (people x size) array of gene counts.
+        """
+        genes = np.empty((len(self.names), size), dtype=np.intp)
+        for i, parents in enumerate(self.parents):
+            if parents is None:
+                table = np.broadcast_to(self.prior[:, np.newaxis], (3, size))
+            else:
+                table = self.inherit[:, genes[parents[0]], genes[parents[1]]]
+            genes[i] = draw(rng, table)
+        return genes
+
+    def evidence(self, genes):
+        """
+        Return the log probability of the known traits for each column of
+        `genes`. The probabilities themselves underflow to zero once there
+        are a few hundred known traits.
+        """
+        with np.errstate(divide="ignore"):
+            log_table = np.log(self.trait_table)
+        weights = np.zeros(genes.shape[1])
+        for i, trait in enumerate(self.traits):
+            if trait is not None:
+                weights += log_table[int(trait)][genes[i]]
+        return weights
+
+    def totals(self, genes, weights):
+        """
+        Return the weighted gene counts (people x 3) and expected number
+        of people with the trait of the samples in `genes`.
+        """
+        gene_sums = np.array([
+            np.bincount(row, weights=weights, minlength=3) for row in genes
+        ])
+        trait_sums = np.array([
+            weights @ self.trait_table[1][row] for row in genes
+        ])
+        return gene_sums, trait_sums
+
+
+def draw(rng, table):
+    """
+    Return one gene count per column of the (3 x k) table of
+    probabilities `table`, whose columns need not be normalized.
+    """
+    cumulative = np.cumsum(table, axis=0)
+    u = rng.random(table.shape[1]) * cumulative[2]
+    return (u >= cumulative[0]).astype(np.intp) + (u >= cumulative[1])
+
+
+def likelihood_batch(model, size, seed):
+    """
+    Return (gene sums, trait sums, total weight, log scale) of `size`
+    likelihood weighted samples, where the sums and total are the true
+    ones divided by exp(log scale).
+    """
+    rng = np.random.default_rng(seed)
+    genes = model.forward(rng, size)
+    log_weights = model.evidence(genes)
+
+    # Rescale so the heaviest sample has weight one
+    scale = log_weights.max()
+    if scale == -np.inf:
+        return np.zeros((len(model.names), 3)), np.zeros(len(model.names)), 0.0, scale
+    weights = np.exp(log_weights - scale)
+    return (*model.totals(genes, weights), weights.sum(), scale)
+
+
+def gibbs_batch(model, size, seed, chains=CHAINS, burn_in=BURN_IN):
+    """
+    Return (gene sums, trait sums, sample count, log scale) of `size`
+    Gibbs samples, taken from `chains` chains after `burn_in` sweeps
+    each. Every sample has weight one, so the log scale is zero.
+    """
+    rng = np.random.default_rng(seed)
+    chains = max(1, min(chains, size))
+    genes = model.forward(rng, chains)
+
+    gene_sums = np.zeros((len(model.names), 3))
+    trait_sums = np.zeros(len(model.names))
+    ones = np.ones(chains)
+    recorded = 0
+    sweep = 0
+    while recorded < size:
+        for i, parents in enumerate(model.parents):
+            # P(genes | parents) times P(known trait | genes)
+            if parents is None:
+                table = np.repeat(model.prior[:, np.newaxis], chains, axis=1)
+            else:
+                table = model.inherit[:, genes[parents[0]], genes[parents[1]]]
+            if model.traits[i] is not None:
+                table = table * model.trait_table[int(model.traits[i])][:, np.newaxis]
+
+            # times P(each child's genes | these genes, the other parent's)
+            for child, role, other in model.children[i]:
+                if role == 0:
+                    table = table * model.inherit[genes[child], :, genes[other]].T
+                else:
+                    table = table * model.inherit[genes[child], genes[other], :].T
+            genes[i] = draw(rng, table)
+
+        sweep += 1
+        if sweep > burn_in:
+            # The last sweep may only need some of the chains
+            take = min(chains, size - recorded)
+            weights = ones if take == chains else np.arange(chains) < take
+            batch_genes, batch_traits = model.totals(genes, weights.astype(float))
+            gene_sums += batch_genes
+            trait_sums += batch_traits
+            recorded += take
+
+    return gene_sums, trait_sums, float(recorded), 0.0
+
+
+SAMPLERS = {
+    "likelihood": likelihood_batch,
+    "gibbs": gibbs_batch
+}
+
+
+def infer(people, probs, method="likelihood", samples=100000, tolerance=None,
+          processes=0, seed=None):
+    """
+    Return the gene and trait distribution of every person in `people`,
+    in the `probabilities` format used by heredity.py, estimated by
+    `method` ("likelihood" or "gibbs") from at most `samples` samples.
+
+    With `tolerance`, sampling stops early once every estimated
+    probability has a standard error (across batches) of at most that.
+    With more than one of `processes`, batches run in a process pool.
+    """
+    if method not in SAMPLERS:
+        raise ValueError(f"method must be one of {', '.join(SAMPLERS)}")
+    sampler = SAMPLERS[method]
+    model = Model(people, probs)
+    seeds = np.random.SeedSequence(seed)
+    pool = ProcessPoolExecutor(max_workers=processes) if processes > 1 else None
+
+    gene_sums = np.zeros((len(model.names), 3))
+    trait_sums = np.zeros(len(model.names))
+    total = 0.0
+    scale = -np.inf
+    estimates = []
+    drawn = 0
+    try:
+        while drawn < samples:
+            # One batch per process at a time
+            sizes = []
+            while drawn < samples and len(sizes) < max(processes, 1):
+                sizes.append(min(BATCH, samples - drawn))
+                drawn += sizes[-1]
+            jobs = zip(sizes, seeds.spawn(len(sizes)))
+            if pool is None:
+                results = [sampler(model, size, seed) for size, seed in jobs]
+            else:
+                results = list(pool.map(sampler, [model] * len(sizes), *zip(*jobs)))
+
+            for batch_genes, batch_traits, batch_total, batch_scale in results:
+                if not batch_total:
+                    continue
+
+                # Bring the running sums and the batch to the larger scale
+                larger = max(scale, batch_scale)
+                kept = np.exp(scale - larger)
+                added = np.exp(batch_scale - larger)
+                gene_sums = gene_sums * kept + batch_genes * added
+                trait_sums = trait_sums * kept + batch_traits * added
+                total = total * kept + batch_total * added
+                scale = larger
+                estimates.append(np.concatenate((batch_genes.ravel(), batch_traits)) / batch_total)
+
+            if tolerance is not None and len(estimates) >= MIN_BATCHES:
+                error = np.std(estimates, axis=0, ddof=1) / np.sqrt(len(estimates))
+                if error.max() <= tolerance:
+                    break
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if not total:
+        raise ValueError("every sample contradicts the known traits")
+
+    probabilities = {}
+    for i, person in enumerate(model.names):
+        trait = model.traits[i]
+        p = float(trait_sums[i] / total) if trait is None else float(trait)
+        probabilities[person] = {
+            "gene": {genes: float(gene_sums[i][genes] / total) for genes in (2, 1, 0)},
+            "trait": {True: p, False: 1 - p}
+        }
+    return {person: probabilities[person] for person in people}
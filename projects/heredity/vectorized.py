@@ -0,0 +1,105 @@
+"""
+Enumeration for heredity with NumPy tables.
+
+Every assignment of gene counts to the n people of a family is a row of
+a (3^n x n) integer array, row r holding the base-3 digits of r. Each
+person's factor is then a table lookup for a whole column at once, the
+joint probabilities are the product of those columns, and accumulating
+them into each person's marginals is one `bincount` per person. Rows are
+processed in blocks so memory stays bounded however large 3^n gets.
+"""
+
+import numpy as np
+
+# Assignments evaluated at once
+BLOCK = 1 << 18
+
+
+def tables(probs):
+    """
+    Return the `PROBS` tables as arrays indexed by gene count: the gene
+    prior, P(trait | genes) indexed by trait then genes, and
+    P(child genes | mother genes, father genes) indexed in that order.
+    """
+    prior = np.array([probs["gene"][genes] for genes in range(3)])
+    trait_table = np.array([
+        [probs["trait"][genes][trait] for genes in range(3)]
+        for trait in (False, True)
+    ])
+
+    passes = np.array([probs["mutation"], 0.5, 1 - probs["mutation"]])
+    m = passes[np.newaxis, :, np.newaxis]
+    f = passes[np.newaxis, np.newaxis, :]
+    inherit = np.concatenate((
+        (1 - m) * (1 - f),
+        m * (1 - f) + (1 - m) * f,
+        m * f
+    ))
+    return prior, trait_table, inherit
+
+
+def parents_first(people):
+    """
+    Return the names in `people` ordered so that everyone comes after
+    their parents. Raise ValueError if some parent is not in `people`.
+    """
+    order = []
+    placed = set()
+    while len(order) < len(people):
+        ready = [
+            person for person in people if person not in placed and all(
+                not parent or parent in placed
+                for parent in (people[person]["mother"], people[person]["father"])
+            )
+        ]
+        if not ready:
+            raise ValueError("some parents are not in the family")
+        order.extend(ready)
+        placed.update(ready)
+    return order
+
+
+def infer(people, probs, block=BLOCK):
+    """
+    Return the gene and trait distribution of every person in `people`,
+    in the `probabilities` format used by heredity.py, already normalized.
+    """
+    names = list(people)
+    column = {person: i for i, person in enumerate(names)}
+    n = len(names)
+
+    prior, trait_table, inherit = tables(probs)
+
+    gene_totals = np.zeros((n, 3))
+    trait_totals = np.zeros(n)
+    powers = 3 ** np.arange(n)
+    for start in range(0, 3 ** n, block):
+        rows = np.arange(start, min(start + block, 3 ** n))
+        genes = (rows[:, np.newaxis] // powers) % 3
+
+        weights = np.ones(len(rows))
+        for person, i in column.items():
+            mother = people[person]["mother"]
+            if mother:
+                father = people[person]["father"]
+                weights *= inherit[genes[:, i], genes[:, column[mother]], genes[:, column[father]]]
+            else:
+                weights *= prior[genes[:, i]]
+            trait = people[person]["trait"]
+            if trait is not None:
+                weights *= trait_table[int(trait)][genes[:, i]]
+
+        for i in range(n):
+            gene_totals[i] += np.bincount(genes[:, i], weights=weights, minlength=3)
+            trait_totals[i] += weights @ trait_table[1][genes[:, i]]
+
+    probabilities = {}
+    for person, i in column.items():
+        total = gene_totals[i].sum()
+        trait = people[person]["trait"]
+        p = float(trait_totals[i] / total) if trait is None else float(trait)
+        probabilities[person] = {
+            "gene": {genes: float(gene_totals[i][genes] / total) for genes in (2, 1, 0)},
+            "trait": {True: p, False: 1 - p}
+        }
+    return probabilities
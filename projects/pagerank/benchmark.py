@@ -0,0 +1,126 @@
+"""
+Benchmark for pagerank on synthetic corpora.
+
+Generates link graphs of a few shapes at a configurable size: uniformly
+random links, power-law links where a few pages attract most of them,
+and power-law links with a share of dangling pages that link nowhere.
+Every ranking engine is run on each, and its runtime, peak memory and
+L1 error against a high-precision reference are reported.
+
+Every engine runs in a freshly spawned process, not a forked one, so
+the peak memory reported is its own and not the parent's as well.
+
+Usage: python benchmark.py [--pages N] [--degree N] [--samples N]
+"""
+
+import argparse
+import multiprocessing
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pagerank
+
+KINDS = ("random", "power-law", "dangling")
+
+# Convergence settings for the iterative engines other than the default
+TIGHT = {"tolerance": 1e-8, "norm": "l1"}
+
+# (label, pagerank function, extra arguments)
+ENGINES = [
+    ("sample", "sample_pagerank", {}),
+    ("sample walkers", "sample_pagerank", {"walkers": 1000}),
+    ("iterate default", "iterate_pagerank", {}),
+    ("iterate jacobi", "iterate_pagerank", TIGHT),
+    ("iterate quadratic", "iterate_pagerank", dict(TIGHT, extrapolation="quadratic")),
+    ("iterate gauss-seidel", "iterate_pagerank", dict(TIGHT, method="gauss-seidel")),
+]
+
+
+def generate(kind, pages, degree, dangling=0.2, seed=0):
+    """
+    Returns a corpus dictionary, as `crawl` would, of `pages` pages
+    with `degree` links each on average. `kind` is one of `KINDS`;
+    "dangling" leaves a `dangling` fraction of the pages without links.
+    """
+    rng = random.Random(seed)
+    names = [f"{i}.html" for i in range(pages)]
+
+    # Page i is linked to with weight 1 / (i + 1), so early pages are hubs
+    weights = None
+    if kind != "random":
+        weights = []
+        total = 0.0
+        for i in range(pages):
+            total += 1 / (i + 1)
+            weights.append(total)
+
+    corpus = {}
+    for i, name in enumerate(names):
+        if kind == "dangling" and rng.random() < dangling:
+            corpus[name] = set()
+            continue
+        if kind == "random":
+            count = rng.randint(0, 2 * degree)
+        else:
+            count = round(rng.expovariate(1 / degree))
+        links = rng.choices(names, cum_weights=weights, k=count)
+        corpus[name] = set(links) - {name}
+    return corpus
+
+
+def run(kind, pages, degree, seed, function, arguments):
+    """
+    Generates the corpus and ranks it with one engine. Runs in a fresh
+    worker process.
+    """
+    corpus = generate(kind, pages, degree, seed=seed)
+    started = time.perf_counter()
+    ranks = getattr(pagerank, function)(corpus, pagerank.DAMPING, **arguments)
+    seconds = time.perf_counter() - started
+
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak *= 1024
+    return {"seconds": seconds, "memory": peak, "ranks": ranks}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pagerank on synthetic corpora.")
+    parser.add_argument("--pages", type=int, default=10000)
+    parser.add_argument("--degree", type=int, default=8, help="mean links per page")
+    parser.add_argument("--samples", type=int, default=pagerank.SAMPLES * 100)
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # A forked worker's peak memory would include the parent's corpus
+    spawn = multiprocessing.get_context("spawn")
+
+    for kind in args.kinds:
+        corpus = generate(kind, args.pages, args.degree, seed=args.seed)
+        links = sum(len(links) for links in corpus.values())
+        empty = sum(not links for links in corpus.values())
+        print(f"\n{kind}: {args.pages} pages, {links} links, {empty} dangling")
+        reference = pagerank.iterate_pagerank(
+            corpus, pagerank.DAMPING, tolerance=1e-14, norm="l1"
+        )
+
+        print(f"{'engine':<24}{'seconds':>9}{'peak MB':>9}{'L1 error':>11}")
+        for label, function, arguments in ENGINES:
+            if function == "sample_pagerank":
+                arguments = dict(arguments, n=args.samples)
+            with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                result = pool.submit(
+                    run, kind, args.pages, args.degree, args.seed, function, arguments
+                ).result()
+            error = sum(abs(result["ranks"][page] - reference[page]) for page in corpus)
+            print(f"{label:<24}{result['seconds']:>9.3f}{result['memory'] / 2 ** 20:>9.0f}"
+                  f"{error:>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Persistent crawl results for a pagerank corpus, so a re-crawl only
+parses the pages that changed.
+
+The cache file in the corpus directory records, for every page, its
+size and modification time, a SHA-1 of its contents and the pages it
+links to, together with the most recent rank vector and the damping
+factor and tolerance it was computed with. A page whose size and modification time
+still match is not read at all; one that was touched but hashes the
+same is re-parsed but not counted as changed.
+"""
+
+import os
+import pickle
+
+VERSION = 2
+
+
+def cache_path(directory):
+    """
+    Return the path of the crawl cache file for `directory`.
+    """
+    return os.path.join(directory, ".pagerank.cache")
+
+
+def load_cache(directory):
+    """
+    Return the (pages, ranks) stored for `directory`, where `pages` maps
+    each page to (size, mtime, digest, links) and `ranks` is None or a
+    (damping_factor, tolerance, {page: rank}) triple. Missing, unreadable
+    or outdated caches are returned empty.
+    """
+    try:
+        with open(cache_path(directory), "rb") as f:
+            version, pages, ranks = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        return {}, None
+    if version != VERSION:
+        return {}, None
+    return pages, ranks
+
+
+def save_cache(directory, pages, ranks=None):
+    """
+    Write the crawl cache for `directory`, replacing any previous one.
+    """
+    path = cache_path(directory)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        pickle.dump((VERSION, pages, ranks), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+
+
+def stamp(path):
+    """
+    Return the (size, mtime) used to decide whether a page needs reading.
+    """
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
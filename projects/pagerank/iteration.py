@@ -0,0 +1,260 @@
+"""
+Power iteration for PageRank over a LinkGraph, with the knobs needed to
+trade speed for accuracy on large graphs.
+
+A sweep is either Jacobi (every page updated from the previous vector,
+one sparse matrix-vector product) or Gauss-Seidel (pages updated in
+order, each from the newest ranks of the pages linking to it). Every
+`EXTRAPOLATE_EVERY` sweeps the last few iterates can be extrapolated
+towards the limit with Aitken's delta-squared or Kamvar et al.'s
+quadratic extrapolation. An extrapolated vector is only kept if the
+sweep after it changes less than the sweep before it did; otherwise the
+plain iterate is restored and extrapolation is given up for the run, so
+it costs at most one wasted sweep. An IterationStats records what
+happened.
+"""
+
+import time
+
+import numpy as np
+
+METHODS = ("jacobi", "gauss-seidel")
+NORMS = ("max", "l1", "l2")
+EXTRAPOLATIONS = (None, "aitken", "quadratic")
+
+# Sweeps between extrapolations, so the iterates in between settle
+EXTRAPOLATE_EVERY = 10
+
+
+class IterationStats():
+    """
+    Diagnostics for one run of power iteration. Pass an instance as
+    `stats` to have it filled in.
+    """
+    def __init__(self):
+        self.iterations = 0
+        self.residuals = []
+        self.extrapolations = 0
+        self.converged = False
+        self.seconds = 0.0
+
+    def as_dict(self):
+        return {
+            "iterations": self.iterations,
+            "residuals": list(self.residuals),
+            "extrapolations": self.extrapolations,
+            "converged": self.converged,
+            "seconds": self.seconds
+        }
+
+
+def power_iteration(graph, damping_factor, tolerance=0.001, start=None,
+                    norm="max", max_iterations=None, method="jacobi",
+                    extrapolation=None, stats=None):
+    """
+    Return the PageRank vector of a LinkGraph by power iteration,
+    stopping once the `norm` of the change in one sweep is at most
+    `tolerance`, or after `max_iterations` sweeps.
+    Iteration starts from the uniform vector, or from `start` if given.
+
+    Pages with no links are treated as linking to every page, so their
+    rank is spread evenly rather than lost.
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {', '.join(METHODS)}")
+    if norm not in NORMS:
+        raise ValueError(f"norm must be one of {', '.join(NORMS)}")
+    if extrapolation not in EXTRAPOLATIONS:
+        raise ValueError("extrapolation must be None, 'aitken' or 'quadratic'")
+    if stats is None:
+        stats = IterationStats()
+    started = time.perf_counter()
+
+    n = len(graph)
+    if start is None:
+        ranks = np.full(n, 1 / n)
+    else:
+        ranks = np.asarray(start, dtype=float) / np.sum(start)
+    if method == "jacobi":
+        sweep = jacobi_sweep(graph, damping_factor)
+    else:
+        sweep = gauss_seidel_sweep(graph, damping_factor)
+
+    # The last few iterates, oldest first, for extrapolation, and the
+    # plain iterate and its residual while an extrapolation is on trial
+    history = [ranks]
+    fallback = None
+    while max_iterations is None or stats.iterations < max_iterations:
+        new_ranks = sweep(ranks)
+        stats.iterations += 1
+        residual = float(_norm(new_ranks - ranks, norm))
+        stats.residuals.append(residual)
+        if fallback is not None:
+            # An extrapolation is only kept if a sweep moves it less than
+            # the last sweep moved the plain iterate
+            plain, plain_residual = fallback
+            fallback = None
+            if residual >= plain_residual:
+                # The iterates do not fit the extrapolation, so stop trying
+                ranks = plain
+                extrapolation = None
+                continue
+            stats.extrapolations += 1
+        ranks = new_ranks
+        if residual <= tolerance:
+            stats.converged = True
+            break
+
+        if extrapolation is not None:
+            history = history[-3:] + [ranks]
+            if stats.iterations % EXTRAPOLATE_EVERY == 0:
+                fallback = (ranks, residual)
+                if extrapolation == "aitken":
+                    ranks = aitken(*history[-3:])
+                else:
+                    ranks = quadratic(*history)
+                history = [ranks]
+
+    stats.seconds += time.perf_counter() - started
+    return ranks
+
+
+def batch_iteration(graph, damping_factor, teleports, tolerance=0.001,
+                    norm="max", max_iterations=None, stats=None):
+    """
+    Return one PageRank vector per row of the (k x pages) matrix
+    `teleports`, each row a probability distribution to jump to in
+    place of the uniform one. The k vectors advance together, each
+    dropping out once it has converged, until all of them have.
+
+    Pages with no links still spread their rank over every page, as in
+    `power_iteration`.
+    """
+    if norm not in NORMS:
+        raise ValueError(f"norm must be one of {', '.join(NORMS)}")
+    if stats is None:
+        stats = IterationStats()
+    started = time.perf_counter()
+
+    n = teleports.shape[1]
+    out_degree = np.maximum(graph.out_degree, 1)
+    ranks = teleports.copy()
+    # Rows still changing by more than `tolerance`
+    active = np.arange(len(ranks))
+
+    while len(active) and (max_iterations is None or stats.iterations < max_iterations):
+        # One bincount per row keeps each pass over the edges in cache;
+        # a single bincount over a flattened k x links matrix is slower
+        current = ranks[active]
+        shares = current / out_degree
+        linked = np.empty_like(current)
+        for row in range(len(active)):
+            linked[row] = np.bincount(
+                graph.targets, weights=shares[row][graph.sources], minlength=n
+            )
+        dangling = current[:, graph.dangling].sum(axis=1, keepdims=True) / n
+        new_ranks = (1 - damping_factor) * teleports[active] + damping_factor * (linked + dangling)
+
+        stats.iterations += 1
+        residuals = np.array([_norm(row, norm) for row in new_ranks - current])
+        stats.residuals.append(float(residuals.max()))
+        ranks[active] = new_ranks
+        active = active[residuals > tolerance]
+    stats.converged = not len(active)
+
+    stats.seconds += time.perf_counter() - started
+    return ranks
+
+
+def jacobi_sweep(graph, damping_factor):
+    """
+    Return a function computing one Jacobi sweep: a sparse matrix-vector
+    product over the edge list of `graph`.
+    """
+    n = len(graph)
+    out_degree = np.maximum(graph.out_degree, 1)
+
+    def sweep(ranks):
+        # Rank flowing along each link, and rank held by dangling pages
+        shares = (ranks / out_degree)[graph.sources]
+        linked = np.bincount(graph.targets, weights=shares, minlength=n)
+        dangling = ranks[graph.dangling].sum() / n
+        return (1 - damping_factor) / n + damping_factor * (linked + dangling)
+
+    return sweep
+
+
+def gauss_seidel_sweep(graph, damping_factor):
+    """
+    Return a function computing one Gauss-Seidel sweep, which updates
+    pages in order so each uses the ranks already updated this sweep.
+    Takes fewer sweeps than Jacobi but cannot be vectorised.
+    """
+    n = len(graph)
+    teleport = (1 - damping_factor) / n
+
+    # Links grouped by the page they point to
+    order = np.argsort(graph.targets, kind="stable")
+    sources = graph.sources[order].tolist()
+    counts = np.bincount(graph.targets, minlength=n)
+    offsets = np.concatenate(([0], np.cumsum(counts))).tolist()
+    weights = (1 / np.maximum(graph.out_degree, 1)).tolist()
+    dangling = graph.dangling.tolist()
+
+    def sweep(ranks):
+        ranks = ranks.tolist()
+        held = sum(rank for rank, empty in zip(ranks, dangling) if empty)
+        for page in range(n):
+            linked = 0.0
+            for source in sources[offsets[page]:offsets[page + 1]]:
+                linked += ranks[source] * weights[source]
+            rank = teleport + damping_factor * (linked + held / n)
+            if dangling[page]:
+                held += rank - ranks[page]
+            ranks[page] = rank
+
+        # Updating in place does not preserve the total exactly
+        ranks = np.array(ranks)
+        return ranks / ranks.sum()
+
+    return sweep
+
+
+def aitken(first, second, third):
+    """
+    Return the Aitken delta-squared extrapolation of three successive
+    iterates, keeping the latest rank wherever it is not defined.
+    """
+    step = second - first
+    curvature = third - 2 * second + first
+    safe = np.abs(curvature) > 1e-15
+    ranks = third.copy()
+    ranks[safe] = first[safe] - step[safe] ** 2 / curvature[safe]
+    ranks = np.where(ranks > 0, ranks, third)
+    return ranks / ranks.sum()
+
+
+def quadratic(first, second, third, fourth):
+    """
+    Return the quadratic extrapolation of four successive iterates
+    (Kamvar et al., 2003), which removes the next two eigenvectors'
+    components from the latest one.
+    """
+    ys = np.column_stack((second - first, third - first))
+    gamma_1, gamma_2 = np.linalg.lstsq(ys, -(fourth - first), rcond=None)[0]
+    gamma_3 = 1.0
+    ranks = (
+        (gamma_1 + gamma_2 + gamma_3) * second
+        + (gamma_2 + gamma_3) * third
+        + gamma_3 * fourth
+    )
+    ranks = np.where(ranks > 0, ranks, fourth)
+    return ranks / ranks.sum()
+
+
+def _norm(change, norm):
+    if norm == "l1":
+        return np.abs(change).sum()
+    if norm == "l2":
+        return np.sqrt(np.dot(change, change))
+    return np.abs(change).max()
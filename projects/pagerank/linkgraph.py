@@ -0,0 +1,53 @@
+"""
+Integer-indexed link structure for a pagerank corpus.
+
+Pages are numbered in corpus order and links are stored in CSR form:
+the pages linked to by page `i` are `targets[offsets[i]:offsets[i + 1]]`.
+`sources` repeats each page once per outgoing link, so the pair
+(`sources`, `targets`) is the edge list of the column-stochastic
+transition matrix without needing a sparse-matrix library.
+"""
+
+import numpy as np
+
+
+class LinkGraph():
+    def __init__(self, pages, offsets, targets):
+        self.pages = pages
+        self.index = {page: i for i, page in enumerate(pages)}
+        self.offsets = offsets
+        self.targets = targets
+        self.out_degree = np.diff(offsets)
+        self.sources = np.repeat(np.arange(len(pages)), self.out_degree)
+        self.dangling = self.out_degree == 0
+
+    def __len__(self):
+        return len(self.pages)
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Builds a LinkGraph from a `crawl` corpus dictionary.
+        """
+        pages = list(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+        targets = []
+        for i, page in enumerate(pages):
+            links = sorted(index[link] for link in corpus[page])
+            targets.extend(links)
+            offsets[i + 1] = offsets[i] + len(links)
+        return cls(pages, offsets, np.array(targets, dtype=np.int64))
+
+    def links(self, i):
+        """
+        Returns the indexes of the pages linked to by page `i`.
+        """
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+    def to_dict(self, values):
+        """
+        Returns a dictionary from page name to the matching entry of
+        the per-page array `values`.
+        """
+        return {page: float(value) for page, value in zip(self.pages, values)}
@@ -1,7 +1,21 @@
+import codecs
+import hashlib
+import locale
+import math
 import os
 import random
 import re
 import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import crawlcache
+from iteration import batch_iteration, power_iteration
+from linkgraph import LinkGraph
+
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
 
 DAMPING = 0.85
 SAMPLES = 10000
@@ -21,31 +35,158 @@ def main():
         print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, processes=0, cache=False):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+
+    With `processes`, the pages are parsed in that many worker processes.
+    With `cache`, only pages changed since the last cached crawl are read.
+    """
+    graph = crawl_graph(directory, processes, cache)
+    return {
+        page: {graph.pages[link] for link in graph.links(i)}
+        for i, page in enumerate(graph.pages)
+    }
+
+
+def crawl_graph(directory, processes=0, cache=False):
+    """
+    Parse a directory of HTML pages straight into a LinkGraph.
+
+    Every file is read in fixed-size chunks, so memory does not grow with
+    page size, and with more than one of `processes` files are parsed in
+    a process pool. Pages are numbered as they are listed and each page's
+    links are appended to the graph as its result arrives.
+
+    With `cache`, the links of pages unchanged since the last crawl are
+    taken from the cache file (see crawlcache.py), which is then updated.
+    """
+    graph, entries, changed, ranks = _crawl(directory, processes, cache)
+    if cache:
+        if ranks is not None and (changed or ranks[2].keys() != set(graph.pages)):
+            #The stored ranks no longer match the pages, so keep them only as
+            #a starting point: no tolerance is tight enough to reuse them as is
+            ranks = (ranks[0], math.inf, ranks[2])
+        crawlcache.save_cache(directory, entries, ranks)
+    return graph
+
+
+def update_pagerank(directory, damping_factor, processes=0, tolerance=0.001):
+    """
+    Return PageRank values for the pages in `directory`, re-parsing only
+    the pages changed since the last call for it.
+
+    Iteration starts from the ranks stored by the last call rather than
+    from the uniform vector, so a small edit converges in a few sweeps.
+    The new ranks are stored for the next call. If no page was added,
+    removed or changed since then and the stored ranks were computed with
+    the same damping factor and at least as tight a tolerance, they are
+    returned without iterating at all.
     """
-    pages = dict()
+    graph, entries, changed, previous = _crawl(directory, processes, True)
 
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+    start = None
+    if previous is not None and previous[0] == damping_factor:
+        _, stored_tolerance, stored = previous
+        if not changed and stored_tolerance <= tolerance and stored.keys() == set(graph.pages):
+            crawlcache.save_cache(directory, entries, previous)
+            return stored
+
+        #New pages start at the uniform rank
+        start = np.array([stored.get(page, 1 / len(graph)) for page in graph.pages])
+
+    ranks = graph.to_dict(power_iteration(graph, damping_factor, tolerance, start))
+    crawlcache.save_cache(directory, entries, (damping_factor, tolerance, ranks))
+    return ranks
+
+
+def _crawl(directory, processes, cache):
+    """
+    Crawl `directory` into a LinkGraph. Return the graph, the cache
+    entry of every page (empty without `cache`), the pages whose
+    contents changed and the ranks stored in the cache.
+    """
+    pages = [
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html")
+    ]
+    index = {page: i for i, page in enumerate(pages)}
+    paths = [os.path.join(directory, page) for page in pages]
+
+    #Pages whose size and modification time are unchanged are not read
+    stored, ranks = crawlcache.load_cache(directory) if cache else ({}, None)
+    entries = {}
+    stamps = {}
+    stale = []
+    for page, path in zip(pages, paths):
+        if cache:
+            stamps[page] = crawlcache.stamp(path)
+            entry = stored.get(page)
+            if entry is not None and entry[:2] == stamps[page]:
+                entries[page] = entry
+                continue
+        stale.append(path)
+
+    if processes > 1 and stale:
+        pool = ProcessPoolExecutor(max_workers=processes)
+        chunksize = max(1, len(stale) // (processes * 16))
+        results = pool.map(scan_page, stale, chunksize=chunksize)
+    else:
+        pool = None
+        results = map(scan_page, stale)
 
     # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
+    offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+    targets = array("q")
+    changed = set()
+    try:
+        for i, page in enumerate(pages):
+            if page in entries:
+                links = entries[page][3]
+            else:
+                digest, links = next(results)
+                if cache:
+                    if page not in stored or stored[page][2] != digest:
+                        changed.add(page)
+                    entries[page] = (*stamps[page], digest, tuple(links))
+            linked = sorted({index[link] for link in links if link in index} - {i})
+            targets.extend(linked)
+            offsets[i + 1] = len(targets)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    graph = LinkGraph(pages, offsets, np.frombuffer(targets, dtype=np.int64))
+    return graph, entries, changed, ranks
 
-    return pages
+
+def scan_page(path, chunk_size=1 << 16):
+    """
+    Return the SHA-1 digest of the file at `path` and the set of href
+    targets of its <a> tags, reading it `chunk_size` bytes at a time.
+    """
+    digest = hashlib.sha1()
+    decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))()
+    links = set()
+    carry = ""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            digest.update(chunk)
+            text = carry + decoder.decode(chunk, final=not chunk)
+            if not chunk:
+                links.update(LINK.findall(text))
+                return digest.hexdigest(), links
+
+            #Hold back from the last "<" on, in case a tag is split across
+            #chunks, unless it has grown too long to be a real tag
+            cut = text.rfind("<")
+            if cut == -1 or len(text) - cut > chunk_size:
+                cut = len(text)
+            links.update(LINK.findall(text, 0, cut))
+            carry = text[cut:]
 
 
 def transition_model(corpus, page, damping_factor):
@@ -76,68 +217,184 @@ def transition_model(corpus, page, damping_factor):
     
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, walkers=0, processes=0):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
 
+    With `walkers`, that many independent surfers are advanced together
+    with NumPy instead (see `walker_pagerank`), optionally split across
+    `processes` worker processes.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    page_visited_count = {page: 0 for page in corpus}
-    current_page = random.choice(list(corpus.keys()))
-    page_visited_count[current_page] += 1
+    if walkers:
+        return walker_pagerank(corpus, damping_factor, n, walkers, processes)
+
+    #The transition model is a mix of two uniform choices, so a step is
+    #a coin flip and then one uniform pick: O(1) instead of O(N) per step.
+    #Pages with no links choose from every page either way.
+    pages = list(corpus)
+    index = {page: i for i, page in enumerate(pages)}
+    everywhere = range(len(pages))
+    links = [
+        tuple(index[link] for link in corpus[page]) or everywhere
+        for page in pages
+    ]
+
+    visits = [0] * len(pages)
+    rand = random.random
+    choice = random.choice
+    current = choice(everywhere)
+    visits[current] += 1
 
     for i in range(1, n):
-        current_page_probability = transition_model(corpus, current_page, damping_factor)
-        current_page = random.choices(
-            list(current_page_probability.keys()), 
-            weights=current_page_probability.values(), 
-            k = 1
-        )[0]
-        page_visited_count[current_page] +=1    
-    
-    total_visits = sum(page_visited_count.values())
-    return {page : count / total_visits for page, count in page_visited_count.items()}
+        if rand() < damping_factor:
+            current = choice(links[current])
+        else:
+            current = choice(everywhere)
+        visits[current] += 1
 
+    total_visits = sum(visits)
+    return {page: count / total_visits for page, count in zip(pages, visits)}
 
-def iterate_pagerank(corpus, damping_factor):
+
+def walker_pagerank(corpus, damping_factor, n, walkers=1000, processes=0,
+                    burn_in=50, seed=None):
+    """
+    Return PageRank values for each page by sampling `n` pages with
+    `walkers` random surfers moving in lockstep.
+
+    Every surfer starts on a random page and takes `burn_in` unrecorded
+    steps so its position no longer depends on the start, then all of
+    them record a page per step until `n` samples are taken. With more
+    than one of `processes`, the surfers are split across a process pool
+    and their visit counts summed.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    walkers = max(1, min(walkers, n))
+    processes = max(1, min(processes, walkers))
+
+    #Split the surfers and the samples as evenly as possible
+    seeds = np.random.SeedSequence(seed).spawn(processes)
+    shares = [
+        (walkers // processes + (i < walkers % processes),
+         n // processes + (i < n % processes))
+        for i in range(processes)
+    ]
+
+    if processes == 1:
+        counts = walk(graph, damping_factor, shares[0][1], shares[0][0], burn_in, seeds[0])
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [
+                pool.submit(walk, graph, damping_factor, samples, count, burn_in, seeds[i])
+                for i, (count, samples) in enumerate(shares)
+            ]
+            counts = sum(future.result() for future in futures)
+
+    return graph.to_dict(counts / counts.sum())
+
+
+def walk(graph, damping_factor, n, walkers, burn_in, seed):
+    """
+    Advance `walkers` surfers over a LinkGraph until `n` pages have been
+    recorded after `burn_in` steps, and return the visit count per page.
+    """
+    rng = np.random.default_rng(seed)
+    pages = len(graph)
+    counts = np.zeros(pages, dtype=np.int64)
+    positions = rng.integers(pages, size=walkers)
+
+    step = 0
+    recorded = 0
+    while recorded < n:
+        if step >= burn_in:
+            #The last step may only need some of the surfers
+            take = min(walkers, n - recorded)
+            counts += np.bincount(positions[:take], minlength=pages)
+            recorded += take
+        step += 1
+
+        #Follow a random link with probability d (if there are any),
+        #otherwise jump to a random page
+        degree = graph.out_degree[positions]
+        follow = (rng.random(walkers) < damping_factor) & (degree > 0)
+        followers = positions[follow]
+        picks = (rng.random(len(followers)) * degree[follow]).astype(np.int64)
+        positions = rng.integers(pages, size=walkers)
+        positions[follow] = graph.targets[graph.offsets[followers] + picks]
+
+    return counts
+
+
+def iterate_pagerank(corpus, damping_factor, tolerance=0.001, norm="max",
+                     max_iterations=None, method="jacobi", extrapolation=None,
+                     stats=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
 
+    Iteration stops once the `norm` ("max", "l1" or "l2") of the change
+    in one sweep is at most `tolerance`, or after `max_iterations`
+    sweeps. `method` is "jacobi" or "gauss-seidel", and `extrapolation`
+    may be "aitken" or "quadratic" (see iteration.py). Pass an
+    iteration.IterationStats as `stats` to get the iteration count,
+    residual history and time taken.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    probability = {page: 1/len(corpus) for page in corpus}
+    graph = LinkGraph.from_corpus(corpus)
+    ranks = power_iteration(
+        graph, damping_factor, tolerance, norm=norm, max_iterations=max_iterations,
+        method=method, extrapolation=extrapolation, stats=stats
+    )
+    return graph.to_dict(ranks)
 
-    while True:
-        adjustments = []
-        for key in corpus:
-            original_probability = probability[key]
-            sum_of_linking_pages_probabilities = 0
-            for page in corpus:
-                if len(corpus[page]) == 0:
-                    sum_of_linking_pages_probabilities += probability[page] / len(corpus)
-                elif key in corpus[page]:
-                    sum_of_linking_pages_probabilities += probability[page] / len(corpus[page])
-            
-            probability[key] = ((1-damping_factor) / len(corpus)) + (damping_factor * sum_of_linking_pages_probabilities)
-
-            new_probability = probability[key]
-            adjustments.append(abs(new_probability-original_probability))
-
-        if max(adjustments) > 0.001:
-            continue
-        else:
-            break
-        
-    return probability
-                
-            
 
+def personalized_pagerank(corpus, damping_factor, teleports, tolerance=0.001,
+                          norm="max", max_iterations=None, stats=None):
+    """
+    Return personalized PageRank values for every entry of `teleports`,
+    a dictionary from a user or topic to the pages its surfer jumps to:
+    either a collection of pages, chosen from uniformly, or a dictionary
+    from page to weight.
+
+    With probability `damping_factor` the surfer follows a link as in
+    `transition_model`; otherwise it jumps according to its own teleport
+    distribution instead of to any page at random. All of the entries
+    are computed together in one batch.
+
+    Return a dictionary from each key of `teleports` to a dictionary of
+    PageRank values like the one `iterate_pagerank` returns.
+    """
+    graph = LinkGraph.from_corpus(corpus)
+    keys = list(teleports)
+    matrix = np.zeros((len(keys), len(graph)))
+    for row, key in enumerate(keys):
+        weights = teleports[key]
+        if not isinstance(weights, dict):
+            weights = dict.fromkeys(weights, 1)
+        for page, weight in weights.items():
+            if page not in graph.index:
+                raise ValueError(f"{page} is not in the corpus")
+            if weight < 0:
+                raise ValueError(f"teleport weight for {page} is negative")
+            matrix[row, graph.index[page]] = weight
+        total = matrix[row].sum()
+        if total <= 0:
+            raise ValueError(f"teleport distribution for {key} is empty")
+        matrix[row] /= total
+
+    ranks = batch_iteration(
+        graph, damping_factor, matrix, tolerance,
+        norm=norm, max_iterations=max_iterations, stats=stats
+    )
+    return {key: graph.to_dict(row) for key, row in zip(keys, ranks)}
 
 
 if __name__ == "__main__":
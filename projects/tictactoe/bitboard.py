@@ -0,0 +1,159 @@
+"""
+Tic Tac Toe engine on bitboards
+
+A state is a pair of 9-bit integers (x, o), bit 3 * i + j set when that
+player has marked cell (i, j). Wins are checked against precomputed line
+masks and whose turn it is follows from the number of marks, so no
+function scans a board. Exposes the same functions as tictactoe.py, with
+`from_board` and `to_board` converting to and from its list-of-lists
+boards.
+"""
+
+from tictactoe import EMPTY, O, X
+
+# Every cell marked
+FULL = 0b111111111
+
+# The three rows, three columns and two diagonals
+WINS = (
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100
+)
+
+# The (i, j) action of every cell, by bit position
+CELLS = [(i, j) for i in range(3) for j in range(3)]
+
+# Minimax value of every state searched so far, kept across calls and games
+TABLE = {}
+
+
+def from_board(board):
+    """
+    Returns the bitboard state of a list-of-lists board.
+    """
+    x = o = 0
+    for position, (i, j) in enumerate(CELLS):
+        if board[i][j] == X:
+            x |= 1 << position
+        elif board[i][j] == O:
+            o |= 1 << position
+    return x, o
+
+
+def to_board(state):
+    """
+    Returns the list-of-lists board of a bitboard state.
+    """
+    x, o = state
+    board = [[EMPTY, EMPTY, EMPTY] for _ in range(3)]
+    for position, (i, j) in enumerate(CELLS):
+        if x >> position & 1:
+            board[i][j] = X
+        elif o >> position & 1:
+            board[i][j] = O
+    return board
+
+
+def initial_state():
+    """
+    Returns starting state of the board.
+    """
+    return 0, 0
+
+
+def player(state):
+    """
+    Returns player who has the next turn on a board.
+    """
+    x, o = state
+    return X if bin(x).count("1") == bin(o).count("1") else O
+
+
+def actions(state):
+    """
+    Returns set of all possible actions (i, j) available on the board.
+    """
+    free = ~(state[0] | state[1]) & FULL
+    return {CELLS[position] for position in range(9) if free >> position & 1}
+
+
+def result(state, action):
+    """
+    Returns the board that results from making move (i, j) on the board.
+    """
+    i, j = action
+    if not (0 <= i <= 2 and 0 <= j <= 2):
+        raise Exception("Out of Bounds")
+    x, o = state
+    bit = 1 << (3 * i + j)
+    if (x | o) & bit:
+        raise Exception("Invalid Input")
+    return (x | bit, o) if player(state) == X else (x, o | bit)
+
+
+def winner(state):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    x, o = state
+    for line in WINS:
+        if x & line == line:
+            return X
+        if o & line == line:
+            return O
+    return None
+
+
+def terminal(state):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    return winner(state) is not None or state[0] | state[1] == FULL
+
+
+def utility(state):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    return {X: 1, O: -1, None: 0}[winner(state)]
+
+
+def value(state):
+    """
+    Returns the utility of the state with both players playing optimally.
+    """
+    if state in TABLE:
+        return TABLE[state]
+
+    x, o = state
+    if any(x & line == line for line in WINS):
+        v = 1
+    elif any(o & line == line for line in WINS):
+        v = -1
+    elif x | o == FULL:
+        v = 0
+    else:
+        # Mark each free cell for the player to move, straight on the bits
+        free = ~(x | o) & FULL
+        to_move_x = bin(x).count("1") == bin(o).count("1")
+        scores = []
+        while free:
+            bit = free & -free
+            free ^= bit
+            scores.append(value((x | bit, o) if to_move_x else (x, o | bit)))
+        v = max(scores) if to_move_x else min(scores)
+
+    TABLE[state] = v
+    return v
+
+
+def minimax(state):
+    """
+    Returns the optimal action for the current player on the board.
+    """
+    if terminal(state):
+        return None
+
+    best = max if player(state) == X else min
+    return best(sorted(actions(state)), key=lambda action: value(result(state, action)))
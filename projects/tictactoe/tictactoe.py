@@ -2,13 +2,23 @@
 Tic Tac Toe Player
 """
 
-import math
-import copy
-
 X = "X"
 O = "O"
 EMPTY = None
 
+# The 8 rotations and reflections of the board, each as the order to
+# read cells (numbered row by row) in
+SYMMETRIES = []
+for cells in ([0, 1, 2, 3, 4, 5, 6, 7, 8], [2, 1, 0, 5, 4, 3, 8, 7, 6]):
+    for _ in range(4):
+        SYMMETRIES.append(cells)
+        # Rotate a quarter turn
+        cells = [cells[6], cells[3], cells[0], cells[7], cells[4], cells[1], cells[8], cells[5], cells[2]]
+
+# Transposition table: minimax value of every position searched so far,
+# by canonical key, kept across calls and games
+TABLE = {}
+
 
 def initial_state():
     """
@@ -47,7 +57,7 @@ def result(board, action):
     if (action[0] < 0) or ( action[0] > 2) or (action[1] < 0) or ( action[1] > 2):
         raise Exception("Out of Bounds")
     
-    new_board = copy.deepcopy(board)
+    new_board = [row[:] for row in board]
     if new_board[action[0]][action[1]] == EMPTY:
         new_board[action[0]][action[1]] = player(board)
     else:
@@ -135,39 +145,32 @@ def utility(board):
     return 0
 
 
-def max_value(board, alpha, beta):
+def canonical(board):
     """
-    Recursively computes best achievable utility for X
+    Returns a key shared by the board and all of its rotations and
+    reflections, which have the same minimax value.
     """
-    if terminal(board):
-        return utility(board)
-    
-    v = -math.inf
-
-    for action in actions(board):
-        v = max(v, min_value(result(board, action), alpha, beta))
-        alpha = max(alpha, v)
-        if alpha >=beta:
-            break
-
-    return v
+    cells = "".join(cell or "-" for row in board for cell in row)
+    return min("".join(cells[i] for i in symmetry) for symmetry in SYMMETRIES)
 
 
-def min_value(board, alpha, beta):
+def value(board):
     """
-    Recursively computes best achievable utility for O
+    Returns the utility of the board with both players playing optimally,
+    looked up in or added to the transposition table.
     """
-    if terminal(board):
-        return utility(board)
-    
-    v = math.inf
+    key = canonical(board)
+    if key in TABLE:
+        return TABLE[key]
 
-    for i in actions(board):
-        v = min(v, max_value(result(board, i), alpha, beta))
-        beta = min(beta, v)
-        if alpha >=beta:
-            break
+    if terminal(board):
+        v = utility(board)
+    else:
+        #Alpha-beta scores are only bounds, so search fully to cache exact values
+        scores = [value(result(board, action)) for action in actions(board)]
+        v = max(scores) if player(board) == X else min(scores)
 
+    TABLE[key] = v
     return v
 
 
@@ -177,25 +180,6 @@ def minimax(board):
     """
     if terminal(board):
         return None
-    
-    alpha = -math.inf
-    beta = math.inf
-
-    if player(board) == X:
-        best_score = -math.inf
-        best_action = None
-        for action in actions(board):
-            score = min_value(result(board, action), alpha, beta)
-            if score > best_score:
-                best_score = score
-                best_action = action
-        return best_action
-    else:
-        best_score = math.inf
-        best_action = None
-        for action in actions(board):
-            score = max_value(result(board,action), alpha, beta)
-            if score < best_score:
-                best_score = score
-                best_action = action
-        return best_action
\ No newline at end of file
+
+    best = max if player(board) == X else min
+    return best(actions(board), key=lambda action: value(result(board, action)))